@@ -0,0 +1,81 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from django.urls import path, re_path
+
+from .models import SlowQuery
+from .profiling import (
+    PROFILE_ID_RE, get_profile_path, load_profile, load_profiles,
+)
+
+PROFILES_ON_PAGE = 100
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('sql',
+                    'view',
+                    'calls',
+                    'total_time',
+                    'average_time',
+                    'max_time',
+                    'last_seen',
+                    'plan_captured',)
+    list_filter = ('view',)
+    search_fields = ('sql', 'view',)
+    readonly_fields = ('fingerprint', 'sql', 'params', 'view', 'stack',
+                       'calls', 'total_time', 'max_time', 'first_seen',
+                       'last_seen', 'plan', 'plan_captured',)
+    empty_value_display = '-пусто-'
+
+    def has_add_permission(self, request):
+        return False
+
+
+def profile_list(request):
+    profiles = sorted(
+        load_profiles(), key=lambda profile: profile['duration'], reverse=True
+    )
+    return render(request, 'admin/api/profile_list.html', {
+        **admin.site.each_context(request),
+        'title': 'Профили медленных запросов',
+        'profiles': profiles[:PROFILES_ON_PAGE],
+    })
+
+
+def profile_detail(request, profile_id):
+    try:
+        profile = load_profile(profile_id)
+    except FileNotFoundError:
+        raise Http404
+    return render(request, 'admin/api/profile_detail.html', {
+        **admin.site.each_context(request),
+        'title': f'{profile["method"]} {profile["path"]}',
+        'profile': profile,
+    })
+
+
+def profile_download(request, profile_id, extension):
+    try:
+        profile_file = open(get_profile_path(profile_id, extension), 'rb')
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(
+        profile_file, as_attachment=True,
+        filename=f'{profile_id}.{extension}',
+    )
+
+
+urlpatterns = [
+    path('', admin.site.admin_view(profile_list), name='profile_list'),
+    re_path(
+        rf'^(?P<profile_id>{PROFILE_ID_RE})/$',
+        admin.site.admin_view(profile_detail),
+        name='profile_detail',
+    ),
+    re_path(
+        rf'^(?P<profile_id>{PROFILE_ID_RE})\.(?P<extension>prof|json)$',
+        admin.site.admin_view(profile_download),
+        name='profile_download',
+    ),
+]
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_KEY = 'auth_user:{}'
+AUTH_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'is_active',
+    'is_staff', 'is_admin', 'is_superuser',
+)
+
+
+def get_auth_field_names():
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname in AUTH_FIELDS
+    ]
+
+
+def get_token_cache_key(key):
+    return TOKEN_CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+class LRUCache:
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+token_cache = LRUCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def invalidate_tokens(keys):
+    cache_keys = [get_token_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+
+    def invalidate():
+        token_cache.delete_many(cache_keys)
+        cache.delete_many(cache_keys)
+
+    transaction.on_commit(invalidate)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        field_names = get_auth_field_names()
+        values = token_cache.get(cache_key)
+        if values is None:
+            values = cache.get(cache_key)
+            if values is None:
+                user, _ = super().authenticate_credentials(key)
+                values = tuple(getattr(user, name) for name in field_names)
+                cache.set(cache_key, values, settings.TOKEN_CACHE_TIMEOUT)
+            token_cache.set(cache_key, values)
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, field_names, values)
+        return user, self.get_model()(key=key, user=user)
@@ -0,0 +1,64 @@
+import threading
+import time
+from weakref import WeakValueDictionary
+
+from django.core.cache import cache
+
+LOCK_KEY = 'lock:{}'
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2
+LOCK_POLL_INTERVAL = 0.05
+
+local_locks = WeakValueDictionary()
+local_locks_guard = threading.Lock()
+
+
+def acquire(key):
+    with local_locks_guard:
+        lock = local_locks.get(key)
+        if lock is None:
+            lock = local_locks[key] = threading.Lock()
+    if not lock.acquire(blocking=False):
+        return None
+    if not cache.add(LOCK_KEY.format(key), True, LOCK_TIMEOUT):
+        lock.release()
+        return None
+    return lock
+
+
+def wait_for(keys):
+    values = {}
+    deadline = time.monotonic() + LOCK_WAIT
+    while keys and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        values.update(cache.get_many(keys))
+        keys = [key for key in keys if key not in values]
+    return values
+
+
+def get_or_build_many(objects, build, timeout):
+    values = cache.get_many(list(objects))
+    missing = [key for key in objects if key not in values]
+    locks = {key: acquire(key) for key in missing}
+    locked = [key for key, lock in locks.items() if lock is not None]
+    try:
+        if locked:
+            values.update(cache.get_many(locked))
+            locked = [key for key in locked if key not in values]
+        if locked:
+            built = dict(zip(locked, build([objects[key] for key in locked])))
+            cache.set_many(built, timeout)
+            values.update(built)
+    finally:
+        cache.delete_many([
+            LOCK_KEY.format(key) for key, lock in locks.items() if lock
+        ])
+        for lock in locks.values():
+            if lock is not None:
+                lock.release()
+    waiting = [key for key in missing if key not in values]
+    values.update(wait_for(waiting))
+    waiting = [key for key in waiting if key not in values]
+    if waiting:
+        values.update(zip(waiting, build([objects[key] for key in waiting])))
+    return values
@@ -0,0 +1,168 @@
+import csv
+import datetime
+import io
+import os
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from recipes.models import Ingredient, ShoppingCartIngredient
+from recipes.versions import get_version_key, get_versions
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+SHOPPING_LIST_FILENAME = 'shopping_list'
+SHOPPING_LIST_TITLE = 'Список покупок сформирован с помощью проекта Foodgram'
+
+
+class IgnoreFormatNegotiation(DefaultContentNegotiation):
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class TextRenderer:
+    format = 'txt'
+    content_type = 'text/plain; charset=utf-8'
+
+    def render_header(self, created):
+        return (
+            f'{SHOPPING_LIST_TITLE}\n'
+            f'Дата формирования списка: {created}\n\n'
+        ).encode()
+
+    def get_filename(self, created):
+        return f'{SHOPPING_LIST_FILENAME}.{self.format}'
+
+    def render(self, rows):
+        for name, measurement_unit, amount in rows:
+            yield f' {name} - {amount} {measurement_unit}\n'.encode()
+
+
+class CSVRenderer(TextRenderer):
+    format = 'csv'
+    content_type = 'text/csv; charset=utf-8'
+
+    def render_header(self, created):
+        return b''
+
+    def render(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+        for name, measurement_unit, amount in rows:
+            writer.writerow((name, amount, measurement_unit))
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+
+
+class PDFRenderer(TextRenderer):
+    format = 'pdf'
+    content_type = 'application/pdf'
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+
+    def render_header(self, created):
+        return b''
+
+    def get_filename(self, created):
+        date = created.replace(' ', '_').replace(':', '-')
+        return f'{SHOPPING_LIST_FILENAME}_{date}.{self.format}'
+
+    def get_font(self):
+        font_path = getattr(settings, 'SHOPPING_LIST_PDF_FONT', None)
+        if not font_path or not os.path.exists(font_path):
+            return 'Helvetica'
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(self.font_name, font_path))
+        return self.font_name
+
+    def render(self, rows):
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4, invariant=True)
+        font = self.get_font()
+        height = A4[1]
+        line_height = self.font_size * 1.5
+        lines = [SHOPPING_LIST_TITLE, '']
+        lines.extend(
+            f'{name} - {amount} {measurement_unit}'
+            for name, measurement_unit, amount in rows
+        )
+        y = height - self.margin
+        pdf.setFont(font, self.font_size)
+        for line in lines:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font, self.font_size)
+                y = height - self.margin
+            pdf.drawString(self.margin, y, line)
+            y -= line_height
+        pdf.save()
+        yield buffer.getvalue()
+
+
+RENDERERS = {
+    renderer.format: renderer
+    for renderer in (TextRenderer(), CSVRenderer(), PDFRenderer())
+    if renderer.format != 'pdf' or canvas is not None
+}
+
+
+def get_shopping_list_key(user, export_format):
+    versions = get_versions([
+        get_version_key(Ingredient),
+        get_version_key(ShoppingCartIngredient),
+        get_version_key(ShoppingCartIngredient, user.pk),
+    ])
+    tokens = ':'.join(token for token, _ in versions.values())
+    return f'shopping_list:{export_format}:{user.pk}:{tokens}'
+
+
+def cache_chunks(key, chunks):
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(content), SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def shopping_list_response(user, export_format):
+    renderer = RENDERERS[export_format]
+    created = datetime.datetime.now().strftime('%d-%m-%Y %H:%M')
+    header = renderer.render_header(created)
+    key = get_shopping_list_key(user, export_format)
+    content = cache.get(key)
+    if content is not None:
+        response = HttpResponse(
+            header + content, content_type=renderer.content_type
+        )
+    else:
+        rows = ShoppingCartIngredient.objects.filter(user=user).values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit__name',
+            'amount',
+        ).order_by(
+            'ingredient__name',
+            'ingredient__measurement_unit__name',
+        ).iterator()
+        response = StreamingHttpResponse(
+            chain([header], cache_chunks(key, renderer.render(rows))),
+            content_type=renderer.content_type,
+        )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{renderer.get_filename(created)}"'
+    )
+    return response
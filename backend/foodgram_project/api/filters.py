@@ -1,25 +1,108 @@
+from django import forms
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchQueryField, SearchRank,
+)
+from django.core.cache import cache
+from django.db.models import F, Func
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from recipes.models import Recipe, RecipeTag, Tag
+from recipes.versions import get_version
 from users.models import CustomUser
 
+TAG_MAP_KEY = 'tag_map:{}'
+SEARCH_WEIGHT_TIERS = ('A', 'AB', None)
 
-class IngredientSearchFilter(SearchFilter):
-    search_param = 'name'
+
+class WeightedSearchQuery(Func):
+    template = (
+        "regexp_replace(%(expressions)s::text, "
+        "'''(?:[^'']|'''')*''', '\\&:%(weights)s', 'g')::tsquery"
+    )
+
+    def __init__(self, query, weights):
+        super().__init__(
+            query, weights=weights, output_field=SearchQueryField()
+        )
+
+
+def get_tag_map():
+    key = TAG_MAP_KEY.format(get_version(Tag)[0])
+    tag_map = cache.get(key)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_map, None)
+    return tag_map
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.Filter(
+        method='filter_tags', widget=forms.MultipleHiddenInput
+    )
+    tags_match = filters.ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='filter_tags_match',
+    )
     author = filters.ModelChoiceFilter(queryset=CustomUser.objects.all())
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'Сначала популярные'),),
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author')
 
+    def filter_tags(self, queryset, name, value):
+        tag_map = get_tag_map()
+        tag_ids = {tag_map[slug] for slug in value if slug in tag_map}
+        if self.form.cleaned_data.get('tags_match') == 'all':
+            if len(tag_ids) < len(set(value)):
+                return queryset.none()
+            for tag_id in tag_ids:
+                queryset = queryset.filter(pk__in=RecipeTag.objects.filter(
+                    tag_id=tag_id
+                ).values('recipe_id'))
+            return queryset
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(pk__in=RecipeTag.objects.filter(
+            tag_id__in=tag_ids
+        ).values('recipe_id'))
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        query = SearchQuery(value, config='russian')
+        limit = settings.SEARCH_CANDIDATES
+        if limit > 0:
+            queryset = queryset.filter(pk__in=self.get_candidates(
+                queryset, query, limit
+            ))
+        else:
+            queryset = queryset.filter(search_vector=query)
+        return queryset.order_by(
+            SearchRank(F('search_vector'), query).desc(), '-pub_date'
+        )
+
+    def get_candidates(self, queryset, query, limit):
+        first, *rest = (
+            queryset.filter(
+                search_vector=query if weights is None
+                else WeightedSearchQuery(query, weights)
+            ).order_by('-pub_date', '-id').values('pk')[:limit]
+            for weights in SEARCH_WEIGHT_TIERS
+        )
+        return first.union(*rest, all=True)
+
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
             return queryset.filter(favorites__user=self.request.user)
@@ -29,3 +112,10 @@ class RecipeFilter(FilterSet):
         if value and not self.request.user.is_anonymous:
             return queryset.filter(shopping_carts__user=self.request.user)
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        if value == 'popular':
+            return queryset.order_by(
+                '-favorites_count', '-in_carts_count', '-pub_date', '-id'
+            )
+        return queryset
@@ -0,0 +1,83 @@
+import os
+import time
+
+from django.db import connection
+from prometheus_client import (
+    REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess,
+)
+
+LABELS = ('view', 'method')
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    LABELS,
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_queries',
+    'Количество SQL-запросов на один запрос',
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_SQL_TIME = Counter(
+    'foodgram_request_sql_seconds',
+    'Суммарное время выполнения SQL-запросов',
+    LABELS,
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа',
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def get_labels(request):
+    match = request.resolver_match
+    method = request.method if request.method in METHODS else 'OTHER'
+    return (match.view_name if match else 'unresolved'), method
+
+
+def get_registry():
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryStats()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        labels = get_labels(request)
+        REQUEST_LATENCY.labels(*labels).observe(duration)
+        REQUEST_QUERIES.labels(*labels).observe(queries.count)
+        REQUEST_SQL_TIME.labels(*labels).inc(queries.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True, verbose_name='Отпечаток')),
+                ('sql', models.TextField(verbose_name='Нормализованный запрос')),
+                ('params', models.TextField(blank=True, verbose_name='Параметры')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='Представление')),
+                ('stack', models.TextField(blank=True, verbose_name='Стек вызова')),
+                ('calls', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('total_time', models.FloatField(default=0, verbose_name='Суммарное время, мс')),
+                ('max_time', models.FloatField(default=0, verbose_name='Максимальное время, мс')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(verbose_name='Последний раз')),
+                ('plan', models.TextField(blank=True, verbose_name='План EXPLAIN ANALYZE')),
+                ('plan_captured', models.DateTimeField(blank=True, null=True, verbose_name='План получен')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ['-total_time'],
+            },
+        ),
+    ]
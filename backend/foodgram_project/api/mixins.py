@@ -1,6 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from recipes.versions import get_version
+
+
+class VersionedCacheMixin:
+    def get_cache_version(self):
+        return get_version(self.get_queryset().model)
+
+    def get_cache_key(self, request, token):
+        digest = hashlib.md5(
+            f'{token}:{request.accepted_renderer.format}:'
+            f'{request.get_full_path()}'.encode()
+        ).hexdigest()
+        return f'response:{self.basename}:{digest}'
+
+    def cached_response(self, handler, request, *args, store=True,
+                        **kwargs):
+        token, modified = self.get_cache_version()
+        key = self.get_cache_key(request, token)
+        etag = quote_etag(key.rsplit(':', 1)[1])
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified
+        )
+        if response is None:
+            data = cache.get(key) if store else None
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if store:
+                    cache.set(
+                        key, response.data, settings.RESPONSE_CACHE_TIMEOUT
+                    )
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
 
-class ListRetriveViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
+class ListRetriveViewSet(VersionedCacheMixin, ListModelMixin,
+                         RetrieveModelMixin, GenericViewSet):
     pass
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    fingerprint = models.CharField(
+        'Отпечаток',
+        max_length=32,
+        unique=True,
+    )
+    sql = models.TextField('Нормализованный запрос')
+    params = models.TextField('Параметры', blank=True)
+    view = models.CharField('Представление', max_length=200, blank=True)
+    stack = models.TextField('Стек вызова', blank=True)
+    calls = models.PositiveIntegerField('Количество', default=0)
+    total_time = models.FloatField('Суммарное время, мс', default=0)
+    max_time = models.FloatField('Максимальное время, мс', default=0)
+    first_seen = models.DateTimeField('Впервые', auto_now_add=True)
+    last_seen = models.DateTimeField('Последний раз')
+    plan = models.TextField('План EXPLAIN ANALYZE', blank=True)
+    plan_captured = models.DateTimeField(
+        'План получен',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['-total_time']
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self):
+        return self.sql[:100]
+
+    @property
+    def average_time(self):
+        return self.total_time / self.calls if self.calls else 0
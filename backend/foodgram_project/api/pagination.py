@@ -0,0 +1,134 @@
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class UserPagination(PageNumberPagination):
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class RecipePagination(PageNumberPagination):
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Неверный курсор'
+    cursor_conflicts = ('search', 'ordering')
+    cursor_conflict_message = (
+        'Курсорная пагинация не поддерживает параметры search и ordering'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        if any(request.query_params.get(param, '').strip()
+               for param in self.cursor_conflicts):
+            raise ValidationError({
+                self.cursor_query_param: self.cursor_conflict_message
+            })
+        page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(
+            request.query_params[self.cursor_query_param]
+        )
+        self.count = self.get_count(
+            queryset, request.query_params.get(self.count_query_param)
+        )
+        if position is None:
+            ordering = ('-pub_date', '-pk')
+        elif reverse:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__gte=pub_date)
+                & (Q(pub_date__gt=pub_date) | Q(pk__gt=pk))
+            )
+            ordering = ('pub_date', 'pk')
+        else:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lte=pub_date)
+                & (Q(pub_date__lt=pub_date) | Q(pk__lt=pk))
+            )
+            ordering = ('-pub_date', '-pk')
+
+        results = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(results) > page_size
+        self.page = results[:page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_count(self, queryset, mode):
+        if mode == 'none':
+            return None
+        if mode == 'exact':
+            return queryset.count()
+        return estimate_count(queryset)
+
+    def encode_cursor(self, recipe, reverse):
+        token = f'{int(reverse)}|{recipe.pub_date.isoformat()}|{recipe.pk}'
+        return base64.urlsafe_b64encode(token.encode()).decode()
+
+    def decode_cursor(self, token):
+        if not token:
+            return False, None
+        try:
+            reverse, pub_date, pk = base64.urlsafe_b64decode(
+                token.encode()
+            ).decode().split('|')
+            position = (parse_datetime(pub_date), int(pk))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return reverse == '1', position
+
+    def get_cursor_link(self, recipe, reverse):
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(recipe, reverse),
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = (
+            self.get_cursor_link(self.page[-1], reverse=False)
+            if self.has_next and self.page else None
+        )
+        response['previous'] = (
+            self.get_cursor_link(self.page[0], reverse=True)
+            if self.has_previous and self.page else None
+        )
+        response['results'] = data
+        return Response(response)
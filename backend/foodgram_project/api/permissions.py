@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -34,3 +37,14 @@ class AuthorAdminOrReadOnly(permissions.BasePermission):
             request.user.is_superuser
             or request.user == obj.author
         )
+
+
+class MetricsPermission(permissions.BasePermission):
+    def has_permission(self, request, view):
+        if request.user.is_superuser:
+            return True
+        token = settings.METRICS_TOKEN
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(token) and hmac.compare_digest(
+            header.encode(), f'Bearer {token}'.encode()
+        )
@@ -0,0 +1,206 @@
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from .authentication import CachedTokenAuthentication
+
+PROFILE_ID_RE = r'[0-9a-f]{32}'
+
+local = threading.local()
+
+
+class Capture:
+    def __init__(self):
+        self.queries = []
+        self.timings = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'time': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+    def add_timing(self, name, elapsed, calls=1):
+        timing = self.timings.setdefault(name, [0, 0])
+        timing[0] += elapsed
+        timing[1] += calls
+
+
+def get_capture():
+    return getattr(local, 'capture', None)
+
+
+def timed(method, name, calls):
+    def wrapper(*args, **kwargs):
+        capture = get_capture()
+        if capture is None:
+            return method(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            capture.add_timing(name, time.perf_counter() - started, calls)
+    return wrapper
+
+
+class ProfiledSerializerMixin:
+    def profile_fields(self):
+        name = type(self).__name__
+        for field in self.fields.values():
+            timing = f'{name}.{field.field_name}'
+            field.get_attribute = timed(field.get_attribute, timing, 0)
+            field.to_representation = timed(
+                field.to_representation, timing, 1
+            )
+        self._fields_profiled = True
+
+    def to_representation(self, instance):
+        capture = get_capture()
+        if capture is None:
+            return super().to_representation(instance)
+        if not getattr(self, '_fields_profiled', False):
+            self.profile_fields()
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            capture.add_timing(
+                type(self).__name__, time.perf_counter() - started
+            )
+
+
+def get_store():
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    return settings.PROFILING_DIR
+
+
+def get_profile_path(profile_id, extension):
+    return os.path.join(get_store(), f'{profile_id}.{extension}')
+
+
+def prune_store():
+    store = get_store()
+    entries = sorted(
+        (entry for entry in os.scandir(store) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in entries[settings.PROFILING_MAX_ENTRIES:]:
+        profile_id = entry.name[:-len('.json')]
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(get_profile_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(request, response, profiler, capture, duration):
+    profile_id = uuid.uuid4().hex
+    profiler.dump_stats(get_profile_path(profile_id, 'prof'))
+    serializers = sorted(
+        (
+            {'name': name, 'time': round(total * 1000, 3), 'calls': calls}
+            for name, (total, calls) in capture.timings.items()
+        ),
+        key=lambda timing: timing['time'],
+        reverse=True,
+    )
+    meta = {
+        'id': profile_id,
+        'created': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'user': str(getattr(request, 'profiling_user', '') or ''),
+        'duration': round(duration * 1000, 3),
+        'sql_count': len(capture.queries),
+        'sql_time': round(sum(query['time'] for query in capture.queries), 3),
+        'queries': capture.queries,
+        'serializers': serializers,
+    }
+    path = get_profile_path(profile_id, 'json')
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as meta_file:
+        json.dump(meta, meta_file, ensure_ascii=False)
+    os.replace(f'{path}.tmp', path)
+    prune_store()
+    return profile_id
+
+
+def load_profiles():
+    profiles = []
+    for entry in os.scandir(get_store()):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path, encoding='utf-8') as meta_file:
+                profiles.append(json.load(meta_file))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def load_profile(profile_id):
+    with open(get_profile_path(profile_id, 'json'), encoding='utf-8') as meta:
+        return json.load(meta)
+
+
+def get_staff_user(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            user = (CachedTokenAuthentication().authenticate(request)
+                    or (None, None))[0]
+        except APIException:
+            return None
+    if user is not None and (user.is_staff or user.is_superuser):
+        return user
+    return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if (request.META.get('HTTP_X_PROFILE') == '1'
+                or request.GET.get('profile') == '1'):
+            request.profiling_user = get_staff_user(request)
+            if request.profiling_user is not None:
+                return True
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        capture = Capture()
+        profiler = cProfile.Profile()
+        local.capture = capture
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(capture):
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            local.capture = None
+        duration = time.perf_counter() - started
+        response['X-Profile-Id'] = save_profile(
+            request, response, profiler, capture, duration
+        )
+        return response
@@ -1,13 +1,26 @@
-from django.shortcuts import get_object_or_404
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Manager, Prefetch, prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
 from recipes.models import (
-    Favorites, Follow, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag,
-    UnitOfMeasurement,
+    Follow, Ingredient, Recipe, RecipeIngredient, RecipeTag,
+    ShoppingCartIngredient, Tag, UnitOfMeasurement,
 )
+from recipes.membership import get_user_state
+from recipes.versions import get_version_key, get_versions
 from users.models import CustomUser
+from .caching import get_or_build_many
+from .profiling import ProfiledSerializerMixin
+
+
+class ProfiledModelSerializer(ProfiledSerializerMixin,
+                              serializers.ModelSerializer):
+    pass
 
 
 class UnitOfMeasurementSerializer(serializers.ModelSerializer):
@@ -16,20 +29,20 @@ class UnitOfMeasurementSerializer(serializers.ModelSerializer):
         fields = 'name'
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ProfiledModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug',)
 
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class RecipeShortSerializer(ProfiledModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time',)
         read_only_fields = '__all__',
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ProfiledModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -49,15 +62,18 @@ class UserSerializer(serializers.ModelSerializer):
         if (
             request is None
             or request.user.is_anonymous
-            or request.user == obj.id
+            or request.user.id == obj.id
         ):
             return False
-        return Follow.objects.filter(user=request.user, author=obj.id).exists()
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
+        return obj.id in get_user_state(self.context).followed_ids
 
 
 class UserSubscribtionSerializer(UserSerializer):
-    recipes = RecipeShortSerializer(many=True, read_only=True)
-    recipes_count = serializers.SerializerMethodField()
+    recipes = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = CustomUser
@@ -73,11 +89,17 @@ class UserSubscribtionSerializer(UserSerializer):
         )
         read_only_fields = '__all__',
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+    def get_recipes(self, obj):
+        recipes = obj.recipes.all()
+        recipes_limit = self.context.get('recipes_limit')
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
+        return RecipeShortSerializer(
+            recipes, many=True, context=self.context
+        ).data
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(ProfiledModelSerializer):
     measurement_unit = serializers.SlugRelatedField(
         slug_field='name', queryset=UnitOfMeasurement.objects.all()
     )
@@ -87,7 +109,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit',)
 
 
-class IngredientInReceipeSerializer(serializers.ModelSerializer):
+class IngredientInReceipeSerializer(ProfiledModelSerializer):
     id = serializers.ReadOnlyField(source='ingredient.id')
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
@@ -105,7 +127,14 @@ class IngredientInReceipeSerializer(serializers.ModelSerializer):
         ]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        if isinstance(data, Manager):
+            data = data.all()
+        return self.child.represent_many(list(data))
+
+
+class RecipeSerializer(ProfiledModelSerializer):
     image = Base64ImageField()
     tags = TagSerializer(read_only=True, many=True)
     author = UserSerializer(read_only=True)
@@ -135,63 +164,203 @@ class RecipeSerializer(serializers.ModelSerializer):
             'text',
             'cooking_time',
         ]
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+    def get_cache_keys(self, recipes):
+        request = self.context.get('request')
+        base_url = request.build_absolute_uri('/') if request else ''
+        shared_keys = [get_version_key(Tag), get_version_key(Ingredient)]
+        version_keys = {
+            recipe.pk: (
+                get_version_key(Recipe, recipe.pk),
+                get_version_key(CustomUser, recipe.author_id),
+            )
+            for recipe in recipes
+        }
+        versions = get_versions(shared_keys + [
+            key for keys in version_keys.values() for key in keys
+        ])
+        shared = ':'.join(versions[key][0] for key in shared_keys)
+        cache_keys = []
+        for recipe in recipes:
+            recipe_version, author_version = (
+                versions[key][0] for key in version_keys[recipe.pk]
+            )
+            digest = hashlib.md5(
+                f'{shared}:{recipe_version}:{author_version}:{base_url}'
+                .encode()
+            ).hexdigest()
+            cache_keys.append(f'recipe:{recipe.pk}:{digest}')
+        return cache_keys
+
+    def build_representations(self, recipes):
+        prefetch_related_objects(
+            recipes,
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient__measurement_unit'
+                ),
+            ),
+        )
+        represent = super().to_representation
+        return [represent(recipe) for recipe in recipes]
+
+    def represent_many(self, recipes):
+        cache_keys = self.get_cache_keys(recipes)
+        cached = get_or_build_many(
+            dict(zip(cache_keys, recipes)),
+            self.build_representations,
+            settings.RESPONSE_CACHE_TIMEOUT,
+        )
+        return [
+            self.overlay(recipe, cached[key])
+            for recipe, key in zip(recipes, cache_keys)
+        ]
+
+    def overlay(self, recipe, data):
+        data = dict(data)
+        data['author'] = dict(
+            data['author'],
+            is_subscribed=self.fields['author'].get_is_subscribed(
+                recipe.author
+            ),
+        )
+        data['is_favorited'] = self.get_is_favorited(recipe)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+        return data
 
     def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return Favorites.objects.filter(
-            user=user, recipe=obj).exists()
+        return obj.id in get_user_state(self.context).favorite_ids
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return ShoppingCart.objects.filter(
-            user=user, recipe=obj).exists()
+        return obj.id in get_user_state(self.context).cart_ids
 
 
 class AddRecipeSerializer(RecipeSerializer):
-    def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
-
+    def validate_ingredients_data(self, ingredients):
         if not ingredients:
             raise serializers.ValidationError({
                 'ingredients': 'Заполните хоть один ингридиент'})
-        ingredient_list = []
+        amounts = {}
 
         for ingredient_item in ingredients:
-            ingredient = get_object_or_404(Ingredient,
-                                           id=ingredient_item['id'])
-            if ingredient in ingredient_list:
+            try:
+                ingredient_id = int(ingredient_item['id'])
+                amount = int(ingredient_item['amount'])
+            except (KeyError, TypeError, ValueError):
+                raise serializers.ValidationError({
+                    'ingredients': 'Укажите id и количество ингредиента'
+                })
+            if ingredient_id in amounts:
                 raise serializers.ValidationError('Ингридиенты должны '
                                                   'быть уникальными')
-            ingredient_list.append(ingredient)
-            if int(ingredient_item['amount']) < 0:
+            if amount < 1:
                 raise serializers.ValidationError({
                     'ingredients': ('Количество ингредиентов должно быть'
                                     ' больше 0')
                 })
-        data['ingredients'] = ingredients
+            amounts[ingredient_id] = amount
+
+        if Ingredient.objects.filter(id__in=amounts).count() != len(amounts):
+            raise serializers.ValidationError({
+                'ingredients': 'Ингредиент не найден'})
+        return amounts
+
+    def validate_tags_data(self, tags):
+        if not tags:
+            raise serializers.ValidationError({
+                'tags': 'Укажите хотя бы один тег'})
+        try:
+            tag_ids = {int(tag) for tag in tags}
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({
+                'tags': 'Укажите id тегов'})
+        if Tag.objects.filter(id__in=tag_ids).count() != len(tag_ids):
+            raise serializers.ValidationError({
+                'tags': 'Тег не найден'})
+        return tag_ids
+
+    def validate(self, data):
+        data['ingredients'] = self.validate_ingredients_data(
+            self.initial_data.get('ingredients')
+        )
+        data['tags'] = self.validate_tags_data(self.initial_data.get('tags'))
         return data
 
-    def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+    def create_ingredients(self, amounts, recipe):
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
-                ingredient_id=ingredient.get('id'),
-                amount=ingredient.get('amount'),
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for ingredient_id, amount in amounts.items()
+        )
+
+    def create_tags(self, tag_ids, recipe):
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag_id=tag_id) for tag_id in tag_ids
+        )
+
+    def update_ingredients(self, amounts, recipe):
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe
             )
+        }
+        old_amounts = {
+            ingredient_id: recipe_ingredient.amount
+            for ingredient_id, recipe_ingredient in existing.items()
+        }
+        removed = existing.keys() - amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, recipe_ingredient in existing.items():
+            amount = amounts.get(ingredient_id, recipe_ingredient.amount)
+            if amount != recipe_ingredient.amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients({
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        }, recipe)
+        ShoppingCartIngredient.objects.change_recipe(
+            recipe.id, old_amounts, amounts
+        )
 
+    def update_tags(self, tag_ids, recipe):
+        existing = set(RecipeTag.objects.filter(
+            recipe=recipe
+        ).values_list('tag_id', flat=True))
+        if existing - tag_ids:
+            RecipeTag.objects.filter(
+                recipe=recipe, tag_id__in=existing - tag_ids
+            ).delete()
+        self.create_tags(tag_ids - existing, recipe)
+
+    @transaction.atomic
     def create(self, validated_data):
         image = validated_data.pop('image')
-        ingredients_data = validated_data.pop('ingredients')
+        amounts = validated_data.pop('ingredients')
+        tag_ids = validated_data.pop('tags')
         recipe = Recipe.objects.create(image=image, **validated_data)
-        self.create_ingredients(ingredients_data, recipe)
-        tags_data = self.initial_data.get('tags')
-        recipe.tags.set(tags_data)
+        self.create_ingredients(amounts, recipe)
+        self.create_tags(tag_ids, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.image = validated_data.get('image', instance.image)
         instance.name = validated_data.get('name', instance.name)
@@ -200,98 +369,36 @@ class AddRecipeSerializer(RecipeSerializer):
             'cooking_time', instance.cooking_time
         )
 
-        RecipeIngredient.objects.filter(recipe=instance).all().delete()
-        self.create_ingredients(validated_data.get('ingredients'), instance)
+        self.update_ingredients(validated_data['ingredients'], instance)
+        self.update_tags(validated_data['tags'], instance)
 
-        instance.tags.clear()
-        tags_data = self.initial_data.get('tags')
-        instance.tags.set(tags_data)
-
-        instance.save()
+        instance.save(
+            update_fields=['image', 'name', 'text', 'cooking_time']
+        )
         return instance
 
 
-class FollowSerializer(serializers.ModelSerializer):
+class IdListSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
+class FollowSerializer(ProfiledModelSerializer):
     class Meta:
         model = Follow
         fields = ('user', 'author',)
-        validators = (
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=('user', 'author'),
-                message='Данный автор уже находиться в избранном.'
-            ),
-        )
-
-    def validate(self, data):
-        request = self.context.get('request')
-        author = data.get('author')
-        user = request.user
-
-        if request.method == 'POST' and user == author:
-            raise serializers.ValidationError(
-                'Нельзя подписаться на самого себя'
-            )
-        if (
-            request.method == 'DELETE'
-            and Follow.objects.filter(user=user,
-                                      author=author).exists() is not True
-        ):
-            raise serializers.ValidationError(
-                'Такая подписка остутсвует'
-            )
-
-        return data
 
     def to_representation(self, instance):
+        author = instance.author
+        author.is_subscribed = True
         authors = UserSubscribtionSerializer(
-            instance.author,
+            author,
             context={
-                'request': self.context.get('request')
+                'request': self.context.get('request'),
+                'recipes_limit': self.context.get('recipes_limit'),
             }
         )
         return authors.data
-
-
-class FavoritesSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Favorites
-        fields = ('user', 'recipe',)
-        validators = (
-            UniqueTogetherValidator(
-                queryset=Favorites.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже в избранном'
-            ),
-        )
-
-    def to_representation(self, instance):
-        recipes = RecipeShortSerializer(
-            instance.recipe,
-            context={
-                'request': self.context.get('request')
-            }
-        )
-        return recipes.data
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe',)
-        validators = (
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже в корзине.'
-            ),
-        )
-
-    def to_representation(self, instance):
-        recipes = RecipeShortSerializer(
-            instance.recipe,
-            context={
-                'request': self.context.get('request')
-            }
-        )
-        return recipes.data
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.models import CustomUser
+from .authentication import invalidate_tokens
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (
+        update_fields is not None and set(update_fields) <= {'last_login'}
+    ):
+        return
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
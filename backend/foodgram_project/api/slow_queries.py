@@ -0,0 +1,158 @@
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import (
+    DatabaseError, IntegrityError, connection, transaction,
+)
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import SlowQuery
+
+STACK_DEPTH = 8
+INSTRUMENTATION_FILES = tuple(
+    os.path.join('api', name)
+    for name in ('metrics.py', 'profiling.py', 'slow_queries.py')
+)
+NORMALIZE_PATTERNS = (
+    (re.compile(r'SAVEPOINT "[^"]+"'), 'SAVEPOINT ?'),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s|\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+pending = threading.local()
+
+
+def normalize(sql):
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def redact(params):
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        params = params.values()
+    return ', '.join(
+        repr(param) if param is None or isinstance(param, (bool, int, float))
+        else f'<{type(param).__name__}>'
+        for param in params
+    )
+
+
+def get_stack():
+    project_frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in frame.filename
+        and not frame.filename.endswith(INSTRUMENTATION_FILES)
+    ]
+    return ''.join(traceback.format_list(project_frames[-STACK_DEPTH:]))
+
+
+class SlowQueryLogger:
+    def __init__(self, request):
+        self.request = request
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            if elapsed >= settings.SLOW_QUERY_THRESHOLD:
+                self.slow.append((sql, params, many, elapsed, get_stack()))
+                pending.logger = self
+
+    def get_view(self):
+        match = self.request.resolver_match
+        return match.view_name if match else self.request.path[:200]
+
+    def explain(self, sql, params, many):
+        if (many or connection.vendor != 'postgresql'
+                or not sql.lstrip().upper().startswith('SELECT')
+                or random.random() >= settings.SLOW_QUERY_EXPLAIN_RATE):
+            return None
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+                rows = cursor.fetchall()
+            transaction.set_rollback(True)
+        return '\n'.join(row[0] for row in rows)
+
+    def save(self):
+        view = self.get_view()
+        for sql, params, many, elapsed, stack in self.slow:
+            normalized = normalize(sql)
+            fingerprint = hashlib.md5(normalized.encode()).hexdigest()
+            fields = {
+                'params': redact(params),
+                'view': view,
+                'stack': stack,
+                'last_seen': timezone.now(),
+            }
+            plan = self.explain(sql, params, many)
+            if plan is not None:
+                fields.update(plan=plan, plan_captured=timezone.now())
+            record_slow_query(fingerprint, normalized, elapsed, fields)
+
+
+def record_slow_query(fingerprint, sql, elapsed, fields):
+    queryset = SlowQuery.objects.filter(fingerprint=fingerprint)
+    changes = dict(
+        fields,
+        calls=F('calls') + 1,
+        total_time=F('total_time') + elapsed,
+        max_time=Greatest(F('max_time'), elapsed),
+    )
+    if queryset.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(
+                fingerprint=fingerprint,
+                sql=sql,
+                calls=1,
+                total_time=elapsed,
+                max_time=elapsed,
+                **fields,
+            )
+    except IntegrityError:
+        queryset.update(**changes)
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD <= 0:
+            return self.get_response(request)
+        pending.logger = None
+        with connection.execute_wrapper(SlowQueryLogger(request)):
+            return self.get_response(request)
+
+
+@receiver(request_finished)
+def save_slow_queries(sender, **kwargs):
+    logger = getattr(pending, 'logger', None)
+    if logger is None:
+        return
+    pending.logger = None
+    try:
+        logger.save()
+    except DatabaseError:
+        pass
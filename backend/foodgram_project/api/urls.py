@@ -2,7 +2,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (
-    IngredientsViewSet, RecipeViewSet, TagViewSet, UserSubscribeViewSet,
+    IngredientsViewSet, MetricsView, RecipeViewSet, TagViewSet,
+    UserSubscribeViewSet,
 )
 
 router_v1 = routers.DefaultRouter()
@@ -17,7 +18,7 @@ urlpatterns = [
         UserSubscribeViewSet.as_view({'get': 'subscriptions', }),
         name='subscriptions'
     ),
-    path('', include('djoser.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(router_v1.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
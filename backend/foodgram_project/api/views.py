@@ -1,34 +1,86 @@
-import datetime
-
-from django.db.models import Sum
-from django.shortcuts import HttpResponse, get_object_or_404
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Subquery
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from djoser.views import UserViewSet
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import (
-    LimitOffsetPagination, PageNumberPagination,
-)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from recipes.models import (
-    Favorites, Follow, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag
+    Favorites, Follow, Ingredient, Recipe, ShoppingCart, Tag,
 )
+from recipes.search import ingredient_index
 from users.models import CustomUser
-from .filters import IngredientSearchFilter, RecipeFilter
+from .exports import (
+    RENDERERS, IgnoreFormatNegotiation, shopping_list_response,
+)
+from .filters import RecipeFilter
+from .metrics import get_registry
 from .mixins import ListRetriveViewSet
-from .permissions import AdminOrReadOnly, AuthorAdminOrReadOnly
+from .pagination import RecipePagination, UserPagination
+from .permissions import (
+    AdminOrReadOnly, AuthorAdminOrReadOnly, MetricsPermission,
+)
 from .serializers import (
-    AddRecipeSerializer, FavoritesSerializer, FollowSerializer,
-    IngredientSerializer, RecipeSerializer, ShoppingCartSerializer,
-    TagSerializer, UserSerializer,
+    AddRecipeSerializer, FollowSerializer, IdListSerializer,
+    IngredientSerializer, RecipeSerializer, RecipeShortSerializer,
+    TagSerializer,
 )
 
 
+RECIPE_SHORT_FIELDS = ('id', 'name', 'image', 'cooking_time')
+AUTHOR_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'recipes_count',
+)
+
+
+def get_target_id(pk):
+    try:
+        return int(pk)
+    except (TypeError, ValueError):
+        raise Http404
+
+
+def get_batch_ids(request):
+    serializer = IdListSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return list(dict.fromkeys(serializer.validated_data['ids']))
+
+
+def change_relations(request, model, ids):
+    user_id = request.user.id
+    if request.method == 'POST':
+        found, changed = model.objects.add_many(user_id, ids)
+        statuses = ('created', 'exists')
+    else:
+        changed = model.objects.remove_many(user_id, ids)
+        found = changed | model.objects.existing_targets(set(ids) - changed)
+        statuses = ('deleted', 'missing')
+    return Response({'results': [
+        {
+            'id': pk,
+            'status': (
+                'not_found' if pk not in found
+                else statuses[0] if pk in changed
+                else statuses[1]
+            ),
+        }
+        for pk in ids
+    ]})
+
+
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (AuthorAdminOrReadOnly,)
-    pagination_class = PageNumberPagination
+    pagination_class = RecipePagination
     filter_class = RecipeFilter
 
+    def get_queryset(self):
+        return Recipe.objects.defer('search_vector').select_related('author')
+
     def get_serializer_class(self):
         if self.request.method in ('POST', 'PATCH'):
             return AddRecipeSerializer
@@ -41,99 +93,95 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         detail=False,
         permission_classes=[permissions.IsAuthenticated, ],
+        content_negotiation_class=IgnoreFormatNegotiation,
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        shopping_cart = {}
-
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_carts__user=user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit_id__name'
-        ).order_by(
-            'ingredient__name',
-            'ingredient__measurement_unit_id__name'
-        ).annotate(
-            Sum('amount')
-        )
-
-        for ingredient in ingredients:
-            shopping_cart[ingredient['ingredient__name']] = {
-                'amount': ingredient['amount__sum'],
-                'measurement_unit': ingredient[
-                    'ingredient__measurement_unit_id__name'
-                ]
-            }
-
-        current_date = datetime.datetime.now().strftime("%d-%m-%Y %H:%M")
-        shopping_list = (
-            'Список покупок сформирован с помощью проекта Foodgram\n'
-            f'Дата формирования списка: {current_date}\n\n'
-        )
+        export_format = request.query_params.get('format', 'txt')
+        if export_format not in RENDERERS:
+            return Response({
+                'errors': 'Неподдерживаемый формат списка покупок'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return shopping_list_response(request.user, export_format)
 
-        for ingredient, value in shopping_cart.items():
-            shopping_list = shopping_list + (
-                f' {ingredient} - {value["amount"]} '
-                f'{value["measurement_unit"]}\n'
+    def change_relation(self, model, pk, exists_error, missing_error):
+        recipe_id = get_target_id(pk)
+        user = self.request.user
+        if self.request.method == 'POST':
+            try:
+                recipe, relation = model.objects.add(
+                    user.id, recipe_id, RECIPE_SHORT_FIELDS
+                )
+            except Recipe.DoesNotExist:
+                raise Http404
+            if relation is None:
+                return Response({
+                    'errors': exists_error
+                }, status=status.HTTP_400_BAD_REQUEST)
+            serializer = RecipeShortSerializer(
+                recipe, context={'request': self.request}
             )
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        return HttpResponse(shopping_list, {
-            'Content-Type': 'text/plain',
-            'Content-Disposition': 'attachment; filename="shopping_list.txt"',
-        })
+        if model.objects.remove(user.id, recipe_id) is None:
+            get_object_or_404(Recipe, pk=recipe_id)
+            return Response({
+                'errors': missing_error
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[permissions.IsAuthenticatedOrReadOnly, ],
     )
+    @transaction.atomic
     def favorite(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
-        if request.method == 'POST':
-            data = {
-                'user': user.id,
-                'recipe': recipe.id,
-            }
-            serializer = FavoritesSerializer(
-                data=data, context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        Favorites.objects.filter(
-            user=user,
-            recipe=recipe
-        ).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.change_relation(
+            Favorites, pk, 'Рецепт уже в избранном', 'Рецепта нет в избранном'
+        )
 
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[permissions.IsAuthenticatedOrReadOnly, ]
     )
+    @transaction.atomic
     def shopping_cart(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
-        if request.method == 'POST':
-            data = {
-                'user': user.id,
-                'recipe': recipe.id,
-            }
-            serializer = ShoppingCartSerializer(
-                data=data, context={'request': request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+        return self.change_relation(
+            ShoppingCart, pk, 'Рецепт уже в корзине.', 'Рецепта нет в корзине'
+        )
 
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[permissions.IsAuthenticated, ],
+        url_path='favorite',
+        url_name='favorite-batch',
+    )
+    @transaction.atomic
+    def favorite_batch(self, request):
+        return change_relations(request, Favorites, get_batch_ids(request))
 
-        ShoppingCart.objects.filter(
-            user=user, recipe=recipe
-        ).delete()
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[permissions.IsAuthenticated, ],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+    )
+    @transaction.atomic
+    def shopping_cart_batch(self, request):
+        return change_relations(request, ShoppingCart, get_batch_ids(request))
+
+    @action(
+        detail=False,
+        methods=['DELETE'],
+        permission_classes=[permissions.IsAuthenticated, ],
+        url_path='shopping_cart/clear',
+    )
+    @transaction.atomic
+    def clear_shopping_cart(self, request):
+        ShoppingCart.objects.remove_many(request.user.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -145,52 +193,102 @@ class TagViewSet(ListRetriveViewSet):
 
 class IngredientsViewSet(ListRetriveViewSet):
     permission_classes = (AdminOrReadOnly,)
-    queryset = Ingredient.objects.all()
+    queryset = Ingredient.objects.select_related('measurement_unit')
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
 
+    def search(self, request, *args, **kwargs):
+        return Response(
+            ingredient_index.search(request.query_params.get('name', ''))
+        )
 
-class UserSubscribeViewSet(viewsets.ModelViewSet):
-    permission_classes = (AuthorAdminOrReadOnly,)
-    queryset = CustomUser.objects.all()
-    serializer_class = UserSerializer
-    pagination_class = LimitOffsetPagination
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            self.search, request, *args, store=False, **kwargs
+        )
+
+
+class UserSubscribeViewSet(UserViewSet):
+    pagination_class = UserPagination
+    lookup_field = 'pk'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(is_subscribed=Exists(
+            Follow.objects.filter(user=user, author=OuterRef('pk'))
+        ))
+
+    def get_recipes_limit(self):
+        try:
+            recipes_limit = int(self.request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return None
+        return recipes_limit if recipes_limit >= 0 else None
 
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[permissions.IsAuthenticated, ]
     )
+    @transaction.atomic
     def subscribe(self, request, pk=None):
         user = request.user
-        author = get_object_or_404(CustomUser, pk=pk)
+        author_id = get_target_id(pk)
+
+        if user.id == author_id:
+            return Response({
+                'errors': 'Нельзя подписаться на самого себя'
+                if request.method == 'POST'
+                else 'Вы не можете отписываться от самого себя'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         if request.method == 'POST':
-            data = {
-                'user': user.id,
-                'author': author.id,
-            }
+            try:
+                author, follow = Follow.objects.add(
+                    user.id, author_id, AUTHOR_FIELDS
+                )
+            except CustomUser.DoesNotExist:
+                raise Http404
+            if follow is None:
+                return Response({
+                    'errors': 'Данный автор уже находиться в избранном.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            follow.author = author
             serializer = FollowSerializer(
-                data=data, context={'request': request}
+                follow,
+                context={
+                    'request': request,
+                    'recipes_limit': self.get_recipes_limit(),
+                }
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        if user == author:
+        if Follow.objects.remove(user.id, author_id) is None:
+            get_object_or_404(CustomUser, pk=author_id)
             return Response({
-                'errors': 'Вы не можете отписываться от самого себя'
+                'errors': 'Такая подписка остутсвует'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        follow = get_object_or_404(
-            Follow, user=user, author=author
-        )
-        follow.delete()
-
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[permissions.IsAuthenticated, ],
+        url_path='subscribe',
+        url_name='subscribe-batch',
+    )
+    @transaction.atomic
+    def subscribe_batch(self, request):
+        ids = get_batch_ids(request)
+        if request.user.id in ids:
+            return Response({
+                'errors': 'Нельзя подписаться на самого себя'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return change_relations(request, Follow, ids)
+
     @action(
         detail=True,
         methods=['GET', ],
@@ -199,11 +297,36 @@ class UserSubscribeViewSet(viewsets.ModelViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        recipes_limit = self.get_recipes_limit()
+        recipes = Recipe.objects.defer('search_vector')
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:recipes_limit]
+            ))
+        queryset = Follow.objects.filter(
+            user=user
+        ).select_related('author').prefetch_related(
+            Prefetch('author__recipes', queryset=recipes)
+        )
         pages = self.paginate_queryset(queryset)
         serializer = FollowSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context={
+                'request': request,
+                'recipes_limit': recipes_limit,
+            }
         )
         return self.get_paginated_response(serializer.data)
+
+
+class MetricsView(APIView):
+    permission_classes = [MetricsPermission, ]
+    content_negotiation_class = IgnoreFormatNegotiation
+
+    def get(self, request):
+        return HttpResponse(
+            generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+        )
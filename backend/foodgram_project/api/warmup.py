@@ -0,0 +1,23 @@
+import importlib
+
+from django.db import connections
+from django.urls import get_resolver
+
+from recipes.search import ingredient_index
+from .filters import get_tag_map
+
+WARM_UP_MODULES = ('api.serializers', 'api.views', 'api.admin')
+
+
+def warm_up(close_connections=False):
+    for name in WARM_UP_MODULES:
+        importlib.import_module(name)
+    # Импортирует urlconf и строит таблицы reverse() заранее, иначе это
+    # делает первый запрос воркера.
+    get_resolver()._populate()
+    for connection in connections.all():
+        connection.ensure_connection()
+    get_tag_map()
+    ingredient_index.refresh()
+    if close_connections:
+        connections.close_all()
@@ -0,0 +1,59 @@
+import os
+import threading
+
+from psycopg2 import Error, pool
+
+from ..postgresql import base
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    key = (os.getpid(), alias, settings_dict['NAME'])
+    with pools_lock:
+        if key not in pools:
+            pools[key] = pool.ThreadedConnectionPool(
+                settings_dict.get('POOL_MIN_SIZE', 1),
+                settings_dict.get('POOL_MAX_SIZE', 10),
+                **conn_params,
+            )
+        return pools[key]
+
+
+def is_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, self.settings_dict, conn_params)
+        while True:
+            connection = self.pool.getconn()
+            if not self.health_check_enabled or is_usable(connection):
+                break
+            self.pool.putconn(connection, close=True)
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            broken = self.errors_occurred or not is_usable(self.connection)
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection, close=broken)
@@ -2,9 +2,11 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.admin import urlpatterns as profile_urls
 from foodgram_project.settings import STATIC_ROOT, STATIC_URL
 
 urlpatterns = [
+    path('admin/profiles/', include(profile_urls)),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
 ] + static(STATIC_URL, document_root=STATIC_ROOT)
@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', default=multiprocessing.cpu_count() + 1
+))
+threads = int(os.getenv('GUNICORN_THREADS', default=2))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+preload_app = True
+
+
+def on_starting(server):
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for entry in os.scandir(directory):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+
+
+def post_worker_init(worker):
+    from django.db import DatabaseError
+
+    from api.warmup import warm_up
+
+    try:
+        warm_up(close_connections=worker.cfg.threads > 1)
+    except DatabaseError as error:
+        worker.log.warning('Прогрев воркера не удался: %s', error)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,11 +1,28 @@
 from django.contrib import admin
+from django.db import transaction
 
 from .models import (
     Favorites, Follow, Ingredient, Recipe, RecipeIngredient,
-    RecipeTag, ShoppingCart, Tag, UnitOfMeasurement,
+    RecipeTag, ShoppingCart, ShoppingCartIngredient, Tag, UnitOfMeasurement,
 )
 
 
+def get_recipe_amounts(recipe_ids):
+    return {
+        recipe_id: ShoppingCartIngredient.objects.recipe_amounts([recipe_id])
+        for recipe_id in set(recipe_ids)
+    }
+
+
+def update_cart_amounts(old_amounts):
+    for recipe_id, amounts in old_amounts.items():
+        ShoppingCartIngredient.objects.change_recipe(
+            recipe_id,
+            amounts,
+            ShoppingCartIngredient.objects.recipe_amounts([recipe_id]),
+        )
+
+
 @admin.register(UnitOfMeasurement)
 class UnitOfMeasurementAdmin(admin.ModelAdmin):
     list_display = ('pk',
@@ -54,15 +71,17 @@ class RecipeAdmin(admin.ModelAdmin):
                     'text',
                     'author',
                     'cooking_time',
-                    'favorites_count',)
+                    'favorites_count',
+                    'in_carts_count',)
     search_fields = ('name', 'author', 'ingredients',)
     list_filter = ('name', 'tags', 'author', )
+    readonly_fields = ('favorites_count', 'in_carts_count',)
     empty_value_display = '-пусто-'
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-
-    favorites_count.short_description = 'Включений в избранное'
+    def save_related(self, request, form, formsets, change):
+        old_amounts = get_recipe_amounts([form.instance.pk] if change else [])
+        super().save_related(request, form, formsets, change)
+        update_cart_amounts(old_amounts)
 
 
 @admin.register(RecipeIngredient)
@@ -75,6 +94,27 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     list_filter = ('ingredient',)
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        recipe_ids = [obj.recipe_id]
+        if change:
+            recipe_ids.append(form.initial['recipe'])
+        old_amounts = get_recipe_amounts(recipe_ids)
+        super().save_model(request, obj, form, change)
+        update_cart_amounts(old_amounts)
+
+    def delete_model(self, request, obj):
+        old_amounts = get_recipe_amounts([obj.recipe_id])
+        super().delete_model(request, obj)
+        update_cart_amounts(old_amounts)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        old_amounts = get_recipe_amounts(
+            queryset.values_list('recipe_id', flat=True)
+        )
+        super().delete_queryset(request, queryset)
+        update_cart_amounts(old_amounts)
+
 
 @admin.register(RecipeTag)
 class RecipeTagAdmin(admin.ModelAdmin):
@@ -110,3 +150,13 @@ class ShoppingCartAdmin(admin.ModelAdmin):
                     'recipe',)
     search_fields = ('user', 'recipe',)
     empty_value_display = '-пусто-'
+
+
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(admin.ModelAdmin):
+    list_display = ('pk',
+                    'user',
+                    'ingredient',
+                    'amount',)
+    search_fields = ('user__email', 'ingredient__name',)
+    empty_value_display = '-пусто-'
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ReceiptConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,313 @@
+import json
+import math
+import shutil
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorites, Follow, Ingredient, Recipe, ShoppingCart, Tag, User,
+)
+from .seed_bench import BENCH_IMAGE_DATA
+
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench_api',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+WRITER_EMAIL = 'bench_writer@example.com'
+BATCH_SIZE = 10
+
+READ_SCENARIOS = (
+    ('recipes-list', 'get', '/api/recipes/', None, 200),
+    ('recipes-list-popular', 'get', '/api/recipes/?ordering=popular',
+     None, 200),
+    ('recipes-list-tags', 'get', '/api/recipes/?tags={tag_slug}', None, 200),
+    ('recipes-list-author', 'get', '/api/recipes/?author={author}',
+     None, 200),
+    ('recipes-list-favorited', 'get', '/api/recipes/?is_favorited=1',
+     None, 200),
+    ('recipes-list-in-cart', 'get', '/api/recipes/?is_in_shopping_cart=1',
+     None, 200),
+    ('recipes-detail', 'get', '/api/recipes/{recipe}/', None, 200),
+    ('recipes-download-txt', 'get',
+     '/api/recipes/download_shopping_cart/?format=txt', None, 200),
+    ('recipes-download-csv', 'get',
+     '/api/recipes/download_shopping_cart/?format=csv', None, 200),
+    ('users-list', 'get', '/api/users/', None, 200),
+    ('users-detail', 'get', '/api/users/{author}/', None, 200),
+    ('users-me', 'get', '/api/users/me/', None, 200),
+    ('users-subscriptions', 'get',
+     '/api/users/subscriptions/?recipes_limit=3', None, 200),
+    ('tags-list', 'get', '/api/tags/', None, 200),
+    ('tags-detail', 'get', '/api/tags/{tag}/', None, 200),
+    ('ingredients-list', 'get', '/api/ingredients/?name={ingredient_name}',
+     None, 200),
+    ('ingredients-detail', 'get', '/api/ingredients/{ingredient}/',
+     None, 200),
+)
+WRITE_SCENARIOS = (
+    ('recipes-create', 'post', '/api/recipes/', 'recipe', 201),
+    ('recipes-update', 'patch', '/api/recipes/{created}/', 'recipe', 200),
+    ('recipes-delete', 'delete', '/api/recipes/{created}/', None, 204),
+    ('recipes-favorite-add', 'post', '/api/recipes/{recipe}/favorite/',
+     None, 201),
+    ('recipes-favorite-remove', 'delete', '/api/recipes/{recipe}/favorite/',
+     None, 204),
+    ('recipes-favorite-batch-add', 'post', '/api/recipes/favorite/',
+     'recipes', 200),
+    ('recipes-favorite-batch-remove', 'delete', '/api/recipes/favorite/',
+     'recipes', 200),
+    ('recipes-shopping-cart-add', 'post',
+     '/api/recipes/{recipe}/shopping_cart/', None, 201),
+    ('recipes-shopping-cart-remove', 'delete',
+     '/api/recipes/{recipe}/shopping_cart/', None, 204),
+    ('recipes-shopping-cart-batch-add', 'post',
+     '/api/recipes/shopping_cart/', 'recipes', 200),
+    ('recipes-shopping-cart-batch-remove', 'delete',
+     '/api/recipes/shopping_cart/', 'recipes', 200),
+    ('recipes-shopping-cart-clear', 'delete',
+     '/api/recipes/shopping_cart/clear/', None, 204),
+    ('users-subscribe', 'post', '/api/users/{author}/subscribe/', None, 201),
+    ('users-unsubscribe', 'delete', '/api/users/{author}/subscribe/',
+     None, 204),
+    ('users-subscribe-batch-add', 'post', '/api/users/subscribe/',
+     'authors', 200),
+    ('users-subscribe-batch-remove', 'delete', '/api/users/subscribe/',
+     'authors', 200),
+)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[max(0, math.ceil(share * len(values)) - 1)]
+
+
+def summarize(latencies, queries):
+    return {
+        'p50': round(percentile(latencies, 0.5), 2),
+        'p95': round(percentile(latencies, 0.95), 2),
+        'p99': round(percentile(latencies, 0.99), 2),
+        'mean': round(sum(latencies) / len(latencies), 2),
+        'queries': max(queries),
+    }
+
+
+def authorized_client(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа и количество SQL-запросов для всех '
+            'действий API и сравнивает результат с базовым замером')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Количество прогонов без учёта в результатах',
+        )
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON',
+        )
+        parser.add_argument(
+            '--baseline', help='Файл базового замера для сравнения',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый относительный рост p95',
+        )
+        parser.add_argument(
+            '--min-delta', type=float, default=5,
+            help='Рост p95 в миллисекундах, который не считается регрессией',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--user', help='Email пользователя для сценариев чтения',
+        )
+
+    def get_reader(self, email):
+        users = User.objects.exclude(email=WRITER_EMAIL)
+        if email is not None:
+            users = users.filter(email=email)
+        user = users.order_by('-followers_count').filter(
+            pk__in=Favorites.objects.values('user')
+        ).filter(
+            pk__in=ShoppingCart.objects.values('user')
+        ).filter(pk__in=Follow.objects.values('user')).first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователя с избранным, корзиной и подписками, '
+                'выполните seed_bench'
+            )
+        return user
+
+    def get_writer(self):
+        writer, created = User.objects.get_or_create(
+            email=WRITER_EMAIL,
+            defaults={
+                'username': 'bench_writer',
+                'first_name': 'Бенчмарк',
+                'last_name': 'Бенчмарк',
+            },
+        )
+        for model in (Favorites, ShoppingCart, Follow):
+            model.objects.remove_many(writer.pk)
+        return writer
+
+    def get_context(self, writer):
+        recipes = list(Recipe.objects.exclude(author=writer).order_by(
+            '-favorites_count'
+        ).values_list('id', flat=True)[:BATCH_SIZE])
+        authors = list(User.objects.exclude(pk=writer.pk).order_by(
+            '-followers_count'
+        ).values_list('id', flat=True)[:BATCH_SIZE])
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        if not recipes or not authors or tag is None or ingredient is None:
+            raise CommandError('В базе недостаточно данных для замера')
+        image = f'data:image/png;base64,{BENCH_IMAGE_DATA}'
+        return {
+            'recipe': recipes[0],
+            'author': authors[0],
+            'tag': tag.pk,
+            'tag_slug': tag.slug,
+            'ingredient': ingredient.pk,
+            'ingredient_name': ingredient.name[:3],
+            'payloads': {
+                'recipe': {
+                    'name': 'Бенчмарк',
+                    'text': 'Рецепт для замера',
+                    'cooking_time': 10,
+                    'image': image,
+                    'tags': [tag.pk],
+                    'ingredients': [{'id': ingredient.pk, 'amount': 10}],
+                },
+                'recipes': {'ids': recipes},
+                'authors': {'ids': authors},
+            },
+        }
+
+    def run_scenario(self, client, scenario, context, cold):
+        name, method, path, payload, expected = scenario
+        if cold:
+            cache.clear()
+        data = context['payloads'].get(payload)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(
+                path.format(**context), data=data, format='json'
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != expected:
+            raise CommandError(
+                f'{name}: статус {response.status_code}, '
+                f'ожидался {expected}'
+            )
+        if name == 'recipes-create':
+            context['created'] = response.data['id']
+        return elapsed, len(queries.captured_queries)
+
+    def measure(self, reader, writer, options):
+        context = self.get_context(writer)
+        clients = (
+            (authorized_client(reader), READ_SCENARIOS),
+            (authorized_client(writer), WRITE_SCENARIOS),
+        )
+        measurements = {}
+        for iteration in range(options['warmup'] + options['iterations']):
+            for client, scenarios in clients:
+                for scenario in scenarios:
+                    elapsed, count = self.run_scenario(
+                        client, scenario, context, options['cold']
+                    )
+                    if iteration >= options['warmup']:
+                        latencies, queries = measurements.setdefault(
+                            scenario[0], ([], [])
+                        )
+                        latencies.append(elapsed)
+                        queries.append(count)
+        return {
+            name: summarize(latencies, queries)
+            for name, (latencies, queries) in measurements.items()
+        }
+
+    def compare(self, results, baseline, options):
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: SQL-запросов {result["queries"]}, '
+                    f'было {base["queries"]}'
+                )
+            limit = base['p95'] * (1 + options['tolerance'])
+            if (result['p95'] > limit
+                    and result['p95'] - base['p95'] > options['min_delta']):
+                regressions.append(
+                    f'{name}: p95 {result["p95"]} мс, было {base["p95"]} мс'
+                )
+        return regressions
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"сценарий":36} {"p50":>8} {"p95":>8} {"p99":>8} {"SQL":>4}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:36} {result["p50"]:8.2f} {result["p95"]:8.2f} '
+                f'{result["p99"]:8.2f} {result["queries"]:4}'
+            )
+
+    def handle(self, *args, **options):
+        reader = self.get_reader(options['user'])
+        writer = self.get_writer()
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(CACHES=BENCH_CACHES, ALLOWED_HOSTS=['*'],
+                                   MEDIA_ROOT=media_root):
+                cache.clear()
+                results = self.measure(reader, writer, options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'database': connection.vendor,
+                    'iterations': options['iterations'],
+                    'cold': options['cold'],
+                    'recipes': Recipe.objects.count(),
+                    'users': User.objects.count(),
+                    'results': results,
+                }, output, ensure_ascii=False, indent=2)
+        if not options['baseline']:
+            return
+        with open(options['baseline'], encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        regressions = self.compare(results, baseline, options)
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f'Найдено регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
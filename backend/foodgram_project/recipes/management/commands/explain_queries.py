@@ -0,0 +1,174 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorites, Follow, Ingredient, Recipe, Tag, UnitOfMeasurement, User,
+)
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'explain_queries',
+    }
+}
+LOOKUP_MODELS = (Ingredient, Tag, UnitOfMeasurement)
+
+
+def get_endpoints():
+    recipe = Recipe.objects.order_by('-favorites_count').first()
+    tag = Tag.objects.first()
+    author = User.objects.order_by('-followers_count').first()
+    endpoints = [
+        '/api/tags/',
+        '/api/ingredients/?name=мо',
+        '/api/recipes/',
+        '/api/recipes/?ordering=popular',
+        '/api/users/',
+        '/api/users/me/',
+        '/api/users/subscriptions/?recipes_limit=3',
+        '/api/recipes/?is_favorited=1',
+        '/api/recipes/?is_in_shopping_cart=1',
+        '/api/recipes/download_shopping_cart/',
+    ]
+    if recipe is not None:
+        endpoints.append(f'/api/recipes/{recipe.pk}/')
+    if tag is not None:
+        endpoints.append(f'/api/recipes/?tags={tag.slug}')
+    if author is not None:
+        endpoints += [
+            f'/api/recipes/?author={author.pk}',
+            f'/api/users/{author.pk}/',
+        ]
+    return endpoints
+
+
+def get_table_sizes():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+        )
+        return dict(cursor.fetchall())
+
+
+def iter_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from iter_nodes(child)
+
+
+def get_relations(plan):
+    return {
+        node['Relation Name'] for node in iter_nodes(plan)
+        if 'Relation Name' in node
+    }
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для SQL-запросов основных эндпоинтов '
+            'и находит последовательные сканирования и сортировки '
+            'больших таблиц')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=1000,
+            help='Размер таблицы, начиная с которого она считается большой',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email пользователя для запросов с авторизацией',
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Проверять и справочники (ингредиенты, теги, единицы '
+                 'измерения), которые по умолчанию разрешено читать '
+                 'и сортировать целиком',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Выводить план каждого запроса',
+        )
+
+    def get_user(self, email):
+        users = User.objects.all()
+        if email is not None:
+            users = users.filter(email=email)
+        user = users.filter(
+            pk__in=Favorites.objects.values('user')
+        ).filter(pk__in=Follow.objects.values('user')).first()
+        user = user or users.first()
+        if user is None:
+            raise CommandError('Не найден пользователь для запросов')
+        return user
+
+    def capture(self, user, path):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: статус {response.status_code}')
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def find_problems(self, plan, sizes, min_rows, allowed):
+        problems = []
+        for node in iter_nodes(plan):
+            relation = node.get('Relation Name')
+            if (node['Node Type'] == 'Seq Scan'
+                    and relation not in allowed
+                    and sizes.get(relation, 0) >= min_rows):
+                problems.append(f'Seq Scan on {relation}')
+            if (node['Node Type'] == 'Sort'
+                    and node['Plan Rows'] >= min_rows
+                    and not get_relations(node) <= allowed):
+                problems.append(
+                    f'Sort of {node["Plan Rows"]} rows by '
+                    f'{", ".join(node.get("Sort Key", []))}'
+                )
+        return problems
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN-проверка работает только с PostgreSQL')
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM ANALYZE')
+        sizes = get_table_sizes()
+        allowed = set() if options['strict'] else {
+            model._meta.db_table for model in LOOKUP_MODELS
+        }
+        user = self.get_user(options['user'])
+        failures = 0
+        with override_settings(CACHES=TEST_CACHES, ALLOWED_HOSTS=['*']):
+            for path in get_endpoints():
+                for sql in self.capture(user, path):
+                    plan = self.explain(sql)
+                    if options['verbose_plans']:
+                        self.stdout.write(json.dumps(plan, indent=2))
+                    for problem in self.find_problems(
+                        plan, sizes, options['min_rows'], allowed
+                    ):
+                        failures += 1
+                        self.stdout.write(self.style.ERROR(
+                            f'{path}: {problem}\n  {sql}'
+                        ))
+        if failures:
+            raise CommandError(f'Найдено проблемных планов: {failures}')
+        self.stdout.write(self.style.SUCCESS('Планы запросов в порядке'))
@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import Ingredient, UnitOfMeasurement
+from recipes.versions import bump_version
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(path):
+    with open(path, 'r', encoding='utf-8', newline='') as csv_file:
+        for row in csv.reader(csv_file):
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+
+def read_json(path):
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as json_file:
+        buffer = json_file.read(JSON_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise CommandError(f'Ожидается JSON-массив в файле {path}')
+        position = 1
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if buffer.startswith(']', position):
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                chunk = json_file.read(JSON_CHUNK_SIZE)
+                if not chunk:
+                    raise CommandError(f'Некорректный JSON в файле {path}')
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Загружает справочник ингредиентов из CSV или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.csv'),
+            help='Путь к файлу ingredients.csv или ingredients.json',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='Формат файла, по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной пачке вставки',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать, какие записи будут добавлены, ничего не изменяя',
+        )
+
+    def get_reader(self, path, file_format):
+        file_format = file_format or os.path.splitext(path)[1][1:].lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+        return READERS[file_format]
+
+    def get_units(self, names, dry_run):
+        missing = names - self.units.keys()
+        if missing and not dry_run:
+            UnitOfMeasurement.objects.bulk_create(
+                (UnitOfMeasurement(name=name) for name in missing),
+                ignore_conflicts=True,
+            )
+            self.units.update(UnitOfMeasurement.objects.filter(
+                name__in=missing
+            ).values_list('name', 'id'))
+        return missing
+
+    def load_batch(self, batch, dry_run):
+        rows = {
+            (name.strip(), unit.strip())
+            for name, unit in batch if name.strip() and unit.strip()
+        }
+        new_units = self.get_units({unit for _, unit in rows}, dry_run)
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in rows},
+            measurement_unit__name__in={unit for _, unit in rows},
+        ).values_list('name', 'measurement_unit__name'))
+        new_rows = sorted(rows - existing)
+        if dry_run:
+            if self.verbosity < 1:
+                return len(new_rows)
+            for unit in sorted(new_units):
+                self.stdout.write(f'+ единица измерения: {unit}')
+            for name, unit in new_rows:
+                self.stdout.write(f'+ {name}, {unit}')
+            return len(new_rows)
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit_id=self.units[unit])
+                for name, unit in new_rows
+            ),
+            ignore_conflicts=True,
+        )
+        return len(new_rows)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = self.get_reader(path, options['format'])
+        dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.units = dict(
+            UnitOfMeasurement.objects.values_list('name', 'id')
+        )
+        processed = created = 0
+        with transaction.atomic():
+            for batch in batches(reader(path), options['batch_size']):
+                created += self.load_batch(batch, dry_run)
+                processed += len(batch)
+                if self.verbosity > 0:
+                    self.stderr.write(
+                        f'Обработано строк: {processed}, новых: {created}'
+                    )
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f'Проверено строк: {processed}, будет добавлено: {created}'
+            ))
+            return
+        bump_version(Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Все данные загружены. Строк: {processed}, добавлено: {created}'
+        ))
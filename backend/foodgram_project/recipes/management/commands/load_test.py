@@ -0,0 +1,345 @@
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient, Recipe, Tag, User
+from .bench_api import percentile
+from .seed_bench import BENCH_IMAGE_DATA
+
+JOURNEY_WEIGHTS = {
+    'browse': 50,
+    'search': 20,
+    'favorite': 15,
+    'shopping': 10,
+    'create': 5,
+}
+SAMPLE_SIZE = 1000
+REQUEST_TIMEOUT = 30
+
+
+def parse_stages(value):
+    try:
+        return [
+            (int(users), float(seconds))
+            for users, seconds in (
+                stage.split(':') for stage in value.split(',')
+            )
+        ]
+    except ValueError:
+        raise CommandError(f'Некорректный профиль нагрузки: {value}')
+
+
+def parse_weights(value):
+    weights = dict(JOURNEY_WEIGHTS)
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in weights or not weight.isdigit():
+            raise CommandError(f'Некорректный вес сценария: {item}')
+        weights[name] = int(weight)
+    return weights
+
+
+def sample(rng, queryset):
+    items = list(queryset)
+    return rng.sample(items, min(SAMPLE_SIZE, len(items)))
+
+
+def get_target(stages, elapsed):
+    previous = 0
+    for users, seconds in stages:
+        if elapsed < seconds:
+            return round(previous + (users - previous) * elapsed / seconds)
+        elapsed -= seconds
+        previous = users
+    return previous
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+
+    def record(self, name, elapsed, ok):
+        with self.lock:
+            for key in (name, 'total'):
+                latencies, errors = self.requests.setdefault(key, ([], [0]))
+                latencies.append(elapsed * 1000)
+                errors[0] += not ok
+
+    def summary(self, duration):
+        return {
+            name: {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / duration, 2),
+                'error_rate': round(errors / len(latencies), 4),
+                'p50': round(percentile(latencies, 0.5), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'p99': round(percentile(latencies, 0.99), 2),
+            }
+            for name, (latencies, (errors,)) in sorted(self.requests.items())
+        }
+
+
+class VirtualUser:
+    def __init__(self, number, command, email):
+        self.number = number
+        self.command = command
+        self.email = email
+        self.rng = random.Random(f'{command.seed}:{number}')
+        self.session = requests.Session()
+
+    def call(self, name, method, path, expected=(200, ), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.command.base_url + path,
+                timeout=REQUEST_TIMEOUT, **kwargs
+            )
+        except requests.RequestException:
+            response = None
+        ok = response is not None and response.status_code in expected
+        self.command.stats.record(
+            f'{method} {name}', time.perf_counter() - started, ok
+        )
+        return response if ok else None
+
+    def login(self):
+        response = self.call(
+            '/api/auth/token/login/', 'POST', '/api/auth/token/login/',
+            json={'email': self.email, 'password': self.command.prefix},
+        )
+        if response is None:
+            return False
+        self.session.headers['Authorization'] = (
+            f'Token {response.json()["auth_token"]}'
+        )
+        return True
+
+    def think(self):
+        if self.command.think_time > 0:
+            time.sleep(self.rng.expovariate(1 / self.command.think_time))
+
+    def browse(self):
+        path = '/api/recipes/?cursor='
+        for _ in range(self.rng.randint(1, 4)):
+            response = self.call('/api/recipes/', 'GET', path)
+            if response is None:
+                return
+            page = response.json()
+            for recipe in self.rng.sample(
+                page['results'], min(2, len(page['results']))
+            ):
+                self.think()
+                self.call(
+                    '/api/recipes/{id}/', 'GET',
+                    f'/api/recipes/{recipe["id"]}/',
+                )
+            if not page['next']:
+                return
+            next_url = urlsplit(page['next'])
+            path = f'{next_url.path}?{next_url.query}'
+        slug = self.rng.choice(self.command.tags)[1]
+        self.call('/api/recipes/?tags=', 'GET', f'/api/recipes/?tags={slug}')
+
+    def search(self):
+        name = self.rng.choice(self.command.ingredients)[1]
+        for length in range(1, min(4, len(name)) + 1):
+            self.call(
+                '/api/ingredients/?name=', 'GET', '/api/ingredients/',
+                params={'name': name[:length]},
+            )
+            time.sleep(self.rng.uniform(0.1, 0.3))
+
+    def toggle(self, relation):
+        recipe_id = self.rng.choice(self.command.recipes)
+        path = f'/api/recipes/{recipe_id}/{relation}/'
+        name = f'/api/recipes/{{id}}/{relation}/'
+        self.call(name, 'POST', path, expected=(201, 400))
+        self.think()
+        return name, path
+
+    def favorite(self):
+        name, path = self.toggle('favorite')
+        self.call('/api/recipes/?is_favorited=', 'GET',
+                  '/api/recipes/?is_favorited=1')
+        self.call(name, 'DELETE', path, expected=(204, 400))
+
+    def shopping(self):
+        name, path = self.toggle('shopping_cart')
+        self.call('/api/recipes/download_shopping_cart/', 'GET',
+                  '/api/recipes/download_shopping_cart/')
+        self.call(name, 'DELETE', path, expected=(204, 400))
+
+    def get_recipe_data(self):
+        return {
+            'name': f'Нагрузочный рецепт {self.number}',
+            'text': 'Рецепт создан при нагрузочном тестировании',
+            'cooking_time': self.rng.randint(5, 120),
+            'image': f'data:image/png;base64,{BENCH_IMAGE_DATA}',
+            'tags': [self.rng.choice(self.command.tags)[0]],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': self.rng.randint(1, 500)}
+                for ingredient_id, _ in self.rng.sample(
+                    self.command.ingredients, 3
+                )
+            ],
+        }
+
+    def create(self):
+        response = self.call(
+            '/api/recipes/', 'POST', '/api/recipes/', expected=(201, ),
+            json=self.get_recipe_data(),
+        )
+        if response is None:
+            return
+        path = f'/api/recipes/{response.json()["id"]}/'
+        self.think()
+        self.call('/api/recipes/{id}/', 'GET', path)
+        self.call('/api/recipes/{id}/', 'DELETE', path, expected=(204, ))
+
+    def run(self):
+        journeys = list(self.command.weights)
+        weights = list(self.command.weights.values())
+        logged_in = False
+        while not self.command.stopped.is_set():
+            if self.number >= self.command.target:
+                time.sleep(0.1)
+                continue
+            if not logged_in:
+                logged_in = self.login()
+                if not logged_in:
+                    return
+            getattr(self, self.rng.choices(journeys, weights)[0])()
+            self.think()
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочное тестирование запущенного сервера сценариями '
+            'пользователей: лента, поиск ингредиентов, избранное, корзина '
+            'и создание рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://127.0.0.1:8000',
+            help='Адрес сервера, например gunicorn на localhost',
+        )
+        parser.add_argument(
+            '--stages', default='10:10,10:50',
+            help=('Профиль нагрузки: пары пользователи:секунды через '
+                  'запятую, число пользователей меняется линейно'),
+        )
+        parser.add_argument(
+            '--weights', default='',
+            help='Веса сценариев, например browse=60,create=0',
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0.5,
+            help='Средняя пауза между действиями пользователя, в секундах, '
+                 '0 отключает паузы',
+        )
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс и пароль пользователей, созданных seed_bench',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON',
+        )
+        parser.add_argument(
+            '--baseline', help='Файл предыдущего прогона для сравнения',
+        )
+
+    def load_data(self, users):
+        emails = list(User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).order_by('pk').values_list('email', flat=True)[:users])
+        if len(emails) < users:
+            raise CommandError(
+                f'Нужно пользователей seed_bench: {users}, '
+                f'найдено: {len(emails)}'
+            )
+        rng = random.Random(self.seed)
+        self.recipes = sample(
+            rng, Recipe.objects.order_by('pk').values_list('id', flat=True)
+        )
+        self.tags = list(Tag.objects.order_by('pk').values_list('id', 'slug'))
+        self.ingredients = sample(
+            rng, Ingredient.objects.order_by('pk').values_list('id', 'name')
+        )
+        if not self.recipes or not self.tags or len(self.ingredients) < 3:
+            raise CommandError(
+                'В базе недостаточно данных, выполните seed_bench'
+            )
+        return emails
+
+    def drive(self, stages):
+        duration = sum(seconds for _, seconds in stages)
+        started = time.monotonic()
+        while True:
+            elapsed = time.monotonic() - started
+            if elapsed >= duration:
+                break
+            self.target = get_target(stages, elapsed)
+            time.sleep(0.1)
+        self.stopped.set()
+        return duration
+
+    def report(self, results, baseline):
+        self.stdout.write(
+            f'{"запрос":52} {"rps":>7} {"ошибки":>7} '
+            f'{"p50":>8} {"p95":>8} {"p99":>8}'
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:52} {result["rps"]:7.2f} '
+                f'{result["error_rate"]:7.2%} {result["p50"]:8.1f} '
+                f'{result["p95"]:8.1f} {result["p99"]:8.1f}'
+            )
+            previous = baseline.get(name)
+            if previous:
+                line += f'  (p95 было {previous["p95"]:.1f})'
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        stages = parse_stages(options['stages'])
+        self.weights = parse_weights(options['weights'])
+        self.base_url = options['base_url'].rstrip('/')
+        self.think_time = options['think_time']
+        self.prefix = options['prefix']
+        self.seed = options['seed']
+        self.stats = Stats()
+        self.stopped = threading.Event()
+        self.target = 0
+        emails = self.load_data(max(users for users, _ in stages))
+        threads = [
+            threading.Thread(
+                target=VirtualUser(number, self, email).run, daemon=True
+            )
+            for number, email in enumerate(emails)
+        ]
+        for thread in threads:
+            thread.start()
+        duration = self.drive(stages)
+        for thread in threads:
+            thread.join(REQUEST_TIMEOUT)
+        results = self.stats.summary(duration)
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)['results']
+        self.report(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({
+                    'stages': options['stages'],
+                    'weights': self.weights,
+                    'think_time': self.think_time,
+                    'seed': self.seed,
+                    'duration': duration,
+                    'results': results,
+                }, output, ensure_ascii=False, indent=2)
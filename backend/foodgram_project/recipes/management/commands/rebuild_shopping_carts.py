@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, ShoppingCartIngredient
+from recipes.versions import bump_version_on_commit
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает сводную таблицу ингредиентов корзин '
+            'по текущему составу рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить таблицу с пересчётом, не изменяя её',
+        )
+
+    def get_live_amounts(self):
+        rows = RecipeIngredient.objects.filter(
+            recipe__shopping_carts__isnull=False
+        ).values_list(
+            'recipe__shopping_carts__user', 'ingredient'
+        ).order_by().annotate(Sum('amount'))
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in rows.iterator()
+        }
+
+    def handle(self, *args, **options):
+        live = self.get_live_amounts()
+        if options['verify']:
+            stored = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount in
+                ShoppingCartIngredient.objects.values_list(
+                    'user_id', 'ingredient_id', 'amount'
+                ).iterator()
+            }
+            mismatches = [
+                (key, stored.get(key), live.get(key))
+                for key in sorted({*stored, *live})
+                if stored.get(key) != live.get(key)
+            ]
+            for (user_id, ingredient_id), stored_amount, live_amount in (
+                mismatches
+            ):
+                self.stdout.write(
+                    f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'в таблице {stored_amount}, по рецептам {live_amount}'
+                )
+            if mismatches:
+                raise CommandError(
+                    f'Расхождений в сводной таблице: {len(mismatches)}'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
+            return
+
+        with transaction.atomic():
+            ShoppingCartIngredient.objects.all().delete()
+            ShoppingCartIngredient.objects.bulk_create(
+                (
+                    ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for (user_id, ingredient_id), amount in live.items()
+                    if amount > 0
+                ),
+                batch_size=1000,
+            )
+            bump_version_on_commit(ShoppingCartIngredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводная таблица пересчитана, строк: {len(live)}'
+        ))
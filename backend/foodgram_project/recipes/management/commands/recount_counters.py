@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorites, Follow, Recipe, ShoppingCart, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorites, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, корзин, рецептов '
+            'и подписчиков')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только найти расхождения, не исправляя их',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        with transaction.atomic():
+            for model, field, source, source_field in COUNTERS:
+                actual = count_subquery(source, source_field)
+                drifted = model.objects.annotate(
+                    actual=actual
+                ).exclude(**{field: F('actual')})
+                count = drifted.count()
+                total += count
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}.{field}: '
+                    f'расхождений {count}'
+                )
+                if count and not options['verify']:
+                    model.objects.filter(
+                        pk__in=drifted.values('pk')
+                    ).update(**{field: actual})
+        if options['verify'] and total:
+            raise CommandError(f'Найдено расхождений: {total}')
+        self.stdout.write(self.style.SUCCESS('Счётчики согласованы'))
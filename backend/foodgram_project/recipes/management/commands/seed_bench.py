@@ -0,0 +1,220 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.management.commands.load_ingredients import batches
+from recipes.models import (
+    Favorites, Follow, Ingredient, Recipe, RecipeIngredient, RecipeTag,
+    ShoppingCart, Tag, User,
+)
+from recipes.versions import bump_version_on_commit
+
+BENCH_IMAGE = 'recipe/bench.png'
+BENCH_IMAGE_DATA = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGA'
+    'hKmMIQAAAABJRU5ErkJggg=='
+)
+BENCH_TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'рагу', 'запеканка', 'омлет', 'блины',
+    'котлеты', 'плов', 'паста', 'смузи', 'соус', 'торт', 'оладьи', 'гуляш',
+)
+
+
+def zipf(population, skew):
+    population = list(population)
+    random.shuffle(population)
+    weights = list(accumulate(
+        1 / rank ** skew for rank in range(1, len(population) + 1)
+    ))
+    return population, weights
+
+
+def sample_unique(population, weights, count, exclude=None):
+    count = min(count, len(population) // 2)
+    chosen = set()
+    while len(chosen) < count:
+        for item in random.choices(population, cum_weights=weights, k=count):
+            if item != exclude:
+                chosen.add(item)
+    return list(chosen)[:count]
+
+
+def get_last_id(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def per_user_count(mean):
+    return int(random.expovariate(1 / mean)) if mean > 0 else 0
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, рецептами, '
+            'избранным, корзинами и подписками для нагрузочных замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients', type=int, nargs=2, default=(3, 10),
+            metavar=('MIN', 'MAX'),
+            help='Количество ингредиентов в рецепте',
+        )
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее количество рецептов в избранном у пользователя',
+        )
+        parser.add_argument(
+            '--carts', type=float, default=5,
+            help='Среднее количество рецептов в корзине у пользователя',
+        )
+        parser.add_argument(
+            '--follows', type=float, default=10,
+            help='Среднее количество подписок у пользователя',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности',
+        )
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def bulk(self, model, rows):
+        total = 0
+        started = time.monotonic()
+        for batch in batches(rows, self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        if self.verbosity > 0:
+            self.stderr.write(
+                f'{model._meta.verbose_name_plural}: {total} '
+                f'за {time.monotonic() - started:.1f} с'
+            )
+        return total
+
+    def get_tag_ids(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug, color=color)
+                for name, slug, color in BENCH_TAGS
+            )
+            bump_version_on_commit(Tag)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count, prefix):
+        start = User.objects.filter(username__startswith=f'{prefix}_').count()
+        last_id = get_last_id(User)
+        password = make_password(prefix)
+        self.bulk(User, (
+            User(
+                username=f'{prefix}_{number}',
+                email=f'{prefix}_{number}@example.com',
+                first_name=random.choice(('Анна', 'Иван', 'Мария', 'Олег')),
+                last_name=f'Тестовый {number}',
+                password=password,
+            )
+            for number in range(start, start + count)
+        ))
+        return list(User.objects.filter(
+            pk__gt=last_id, username__startswith=f'{prefix}_'
+        ).values_list('id', flat=True))
+
+    def create_recipes(self, count, authors, weights):
+        last_id = get_last_id(Recipe)
+        self.bulk(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=f'{random.choice(WORDS).capitalize()} {number}',
+                text=' '.join(random.choices(WORDS, k=30)),
+                cooking_time=random.randint(5, 180),
+                image=BENCH_IMAGE,
+            )
+            for number, author_id in enumerate(
+                random.choices(authors, cum_weights=weights, k=count)
+            )
+        ))
+        return list(Recipe.objects.filter(
+            pk__gt=last_id
+        ).values_list('id', flat=True))
+
+    def create_compositions(self, recipe_ids, tag_ids, options):
+        ingredients, weights = zipf(
+            Ingredient.objects.values_list('id', flat=True), options['skew']
+        )
+        low, high = options['ingredients']
+        self.bulk(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=random.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in sample_unique(
+                ingredients, weights, random.randint(low, high)
+            )
+        ))
+        self.bulk(RecipeTag, (
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in random.sample(
+                tag_ids, random.randint(1, min(3, len(tag_ids)))
+            )
+        ))
+
+    def create_relations(self, model, field, users, targets, weights, mean):
+        self.bulk(model, (
+            model(user_id=user_id, **{f'{field}_id': target_id})
+            for user_id in users
+            for target_id in sample_unique(
+                targets, weights, per_user_count(mean),
+                exclude=user_id if model is Follow else None,
+            )
+        ))
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        random.seed(options['seed'])
+        if not Ingredient.objects.exists():
+            raise CommandError(
+                'Справочник ингредиентов пуст, выполните load_ingredients'
+            )
+        with transaction.atomic():
+            tag_ids = self.get_tag_ids()
+            users = self.create_users(options['users'], options['prefix'])
+            authors, author_weights = zipf(users, options['skew'])
+            recipe_ids = self.create_recipes(
+                options['recipes'], authors, author_weights
+            )
+            self.create_compositions(recipe_ids, tag_ids, options)
+            recipes, recipe_weights = zipf(recipe_ids, options['skew'])
+            self.create_relations(
+                Favorites, 'recipe', users, recipes, recipe_weights,
+                options['favorites'],
+            )
+            self.create_relations(
+                ShoppingCart, 'recipe', users, recipes, recipe_weights,
+                options['carts'],
+            )
+            self.create_relations(
+                Follow, 'author', users, authors, author_weights,
+                options['follows'],
+            )
+            call_command('recount_counters', stdout=self.stderr)
+            call_command('rebuild_shopping_carts', stdout=self.stderr)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, '
+            f'рецептов: {len(recipe_ids)}'
+        ))
@@ -0,0 +1,83 @@
+from array import array
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Favorites, Follow, ShoppingCart
+from .versions import get_versions, new_version
+
+STATE_KEY = 'user_state:{}:{}'
+STATE_VERSION_KEY = 'user_state_version:{}'
+STATE_TIMEOUT = 60 * 60
+
+
+def load_ids(queryset, field):
+    return array('q', sorted(
+        queryset.order_by().values_list(field, flat=True)
+    ))
+
+
+class UserState:
+    def __init__(self, user):
+        self.user = user
+        self._ids = None
+
+    @classmethod
+    def for_request(cls, request):
+        state = getattr(request, 'user_state', None)
+        if state is None:
+            state = cls(request.user)
+            request.user_state = state
+        return state
+
+    def get_arrays(self):
+        version_key = STATE_VERSION_KEY.format(self.user.pk)
+        version = get_versions([version_key])[version_key][0]
+        key = STATE_KEY.format(self.user.pk, version)
+        arrays = cache.get(key)
+        if arrays is None:
+            arrays = (
+                load_ids(Favorites.objects.filter(user=self.user), 'recipe'),
+                load_ids(
+                    ShoppingCart.objects.filter(user=self.user), 'recipe'
+                ),
+                load_ids(Follow.objects.filter(user=self.user), 'author'),
+            )
+            cache.set(key, arrays, STATE_TIMEOUT)
+        return arrays
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            if self.user.is_anonymous:
+                self._ids = (frozenset(), frozenset(), frozenset())
+            else:
+                self._ids = tuple(
+                    frozenset(ids) for ids in self.get_arrays()
+                )
+        return self._ids
+
+    @property
+    def favorite_ids(self):
+        return self.ids[0]
+
+    @property
+    def cart_ids(self):
+        return self.ids[1]
+
+    @property
+    def followed_ids(self):
+        return self.ids[2]
+
+
+def get_user_state(context):
+    state = context.get('user_state')
+    if state is None:
+        return UserState.for_request(context['request'])
+    return state
+
+
+def invalidate_user_state(user_id):
+    transaction.on_commit(lambda: cache.set(
+        STATE_VERSION_KEY.format(user_id), new_version(), None
+    ))
@@ -0,0 +1,100 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:32
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+CREATE FUNCTION recipes_recipe_document(
+    recipe_pk integer, recipe_name text, recipe_text text
+) RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('russian', coalesce(recipe_name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_recipeingredient recipe_ingredient
+            JOIN recipes_ingredient ingredient
+                ON ingredient.id = recipe_ingredient.ingredient_id
+            WHERE recipe_ingredient.recipe_id = recipe_pk
+        ), '')), 'B')
+        || setweight(to_tsvector('russian', coalesce(recipe_text, '')), 'C');
+$$ LANGUAGE sql STABLE;
+
+CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := recipes_recipe_document(NEW.id, NEW.name, NEW.text);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector
+    BEFORE INSERT OR UPDATE OF name, text, search_vector ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector();
+
+CREATE FUNCTION recipes_recipeingredient_search_vector() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE recipes_recipe SET search_vector = NULL
+        WHERE id = OLD.recipe_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE recipes_recipe SET search_vector = NULL
+        WHERE id = NEW.recipe_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipeingredient_search_vector
+    AFTER INSERT OR DELETE OR UPDATE OF recipe_id, ingredient_id
+    ON recipes_recipeingredient
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipeingredient_search_vector();
+
+CREATE FUNCTION recipes_ingredient_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE recipes_recipe SET search_vector = NULL
+    WHERE id IN (
+        SELECT recipe_id FROM recipes_recipeingredient
+        WHERE ingredient_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_ingredient_search_vector
+    AFTER UPDATE OF name ON recipes_ingredient
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE PROCEDURE recipes_ingredient_search_vector();
+
+UPDATE recipes_recipe SET search_vector = NULL;
+"""
+
+SEARCH_VECTOR_REVERSE_SQL = """
+DROP TRIGGER recipes_ingredient_search_vector ON recipes_ingredient;
+DROP FUNCTION recipes_ingredient_search_vector();
+DROP TRIGGER recipes_recipeingredient_search_vector
+    ON recipes_recipeingredient;
+DROP FUNCTION recipes_recipeingredient_search_vector();
+DROP TRIGGER recipes_recipe_search_vector ON recipes_recipe;
+DROP FUNCTION recipes_recipe_search_vector();
+DROP FUNCTION recipes_recipe_document(integer, text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, SEARCH_VECTOR_REVERSE_SQL),
+    ]
@@ -0,0 +1,88 @@
+from django.db import migrations
+
+STATEMENT_TRIGGER_SQL = """
+DROP TRIGGER recipes_recipeingredient_search_vector
+    ON recipes_recipeingredient;
+DROP FUNCTION recipes_recipeingredient_search_vector();
+
+CREATE FUNCTION recipes_recipeingredient_search_vector() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE recipes_recipe SET search_vector = NULL
+        WHERE id IN (SELECT recipe_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE recipes_recipe SET search_vector = NULL
+        WHERE id IN (SELECT recipe_id FROM old_rows);
+    ELSE
+        UPDATE recipes_recipe SET search_vector = NULL
+        WHERE id IN (
+            SELECT old_rows.recipe_id FROM old_rows
+            JOIN new_rows ON new_rows.id = old_rows.id
+            WHERE (old_rows.recipe_id, old_rows.ingredient_id)
+                IS DISTINCT FROM (new_rows.recipe_id, new_rows.ingredient_id)
+            UNION
+            SELECT new_rows.recipe_id FROM old_rows
+            JOIN new_rows ON new_rows.id = old_rows.id
+            WHERE (old_rows.recipe_id, old_rows.ingredient_id)
+                IS DISTINCT FROM (new_rows.recipe_id, new_rows.ingredient_id)
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipeingredient_search_vector_insert
+    AFTER INSERT ON recipes_recipeingredient
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE recipes_recipeingredient_search_vector();
+
+CREATE TRIGGER recipes_recipeingredient_search_vector_update
+    AFTER UPDATE ON recipes_recipeingredient
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE recipes_recipeingredient_search_vector();
+
+CREATE TRIGGER recipes_recipeingredient_search_vector_delete
+    AFTER DELETE ON recipes_recipeingredient
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE recipes_recipeingredient_search_vector();
+"""
+
+ROW_TRIGGER_SQL = """
+DROP TRIGGER recipes_recipeingredient_search_vector_insert
+    ON recipes_recipeingredient;
+DROP TRIGGER recipes_recipeingredient_search_vector_update
+    ON recipes_recipeingredient;
+DROP TRIGGER recipes_recipeingredient_search_vector_delete
+    ON recipes_recipeingredient;
+DROP FUNCTION recipes_recipeingredient_search_vector();
+
+CREATE FUNCTION recipes_recipeingredient_search_vector() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE recipes_recipe SET search_vector = NULL
+        WHERE id = OLD.recipe_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE recipes_recipe SET search_vector = NULL
+        WHERE id = NEW.recipe_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipeingredient_search_vector
+    AFTER INSERT OR DELETE OR UPDATE OF recipe_id, ingredient_id
+    ON recipes_recipeingredient
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipeingredient_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(STATEMENT_TRIGGER_SQL, ROW_TRIGGER_SQL),
+    ]
@@ -1,10 +1,23 @@
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F, Sum
 from django.db.models.constraints import UniqueConstraint
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal
+
+from users.models import CounterFieldsMixin
+from .versions import bump_version_on_commit
 
 User = get_user_model()
 
+UPSERT_BATCH_SIZE = 1000
+
+relations_added = Signal(providing_args=['user_id', 'target_ids'])
+relations_removed = Signal(providing_args=['user_id', 'target_ids'])
+
 
 class UnitOfMeasurement(models.Model):
     name = models.CharField(
@@ -76,7 +89,7 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     name = models.CharField(
         'Рецепт',
         max_length=250,
@@ -113,11 +126,42 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Добавлений в корзину',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-in_carts_count', '-pub_date'],
+                name='recipe_popular_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -175,11 +219,199 @@ class RecipeTag(models.Model):
                 name='unique_recipe_tag',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'], name='recipe_tag_tag_recipe_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.recipe} {self.tag}'
 
 
+class UserRelationQuerySet(models.QuerySet):
+    def get_target_field(self):
+        return next(
+            field for field in self.model._meta.concrete_fields
+            if field.is_relation and field.name != 'user'
+        )
+
+    def build_relation(self, pk, user_id, target_id):
+        relation = self.model(pk=pk, user_id=user_id, **{
+            self.get_target_field().attname: target_id
+        })
+        relation._state.adding = False
+        relation._state.db = self.db
+        return relation
+
+    def add(self, user_id, target_id, fields):
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return self.add_with_savepoint(user_id, target_id, fields)
+        quote = connection.ops.quote_name
+        field = self.get_target_field()
+        user_column = quote(self.model._meta.get_field('user').column)
+        pk_column = quote(self.model._meta.pk.column)
+        target_meta = field.related_model._meta
+        target_fields = [
+            target_field for target_field in target_meta.concrete_fields
+            if target_field.name in fields
+        ]
+        target_pk = quote(target_meta.pk.column)
+        sql = (
+            f'WITH target AS ('
+            f'SELECT {", ".join(quote(f.column) for f in target_fields)} '
+            f'FROM {quote(target_meta.db_table)} WHERE {target_pk} = %s'
+            f'), inserted AS ('
+            f'INSERT INTO {quote(self.model._meta.db_table)} '
+            f'({user_column}, {quote(field.column)}) '
+            f'SELECT %s, {target_pk} FROM target '
+            f'ON CONFLICT DO NOTHING RETURNING {pk_column}'
+            f') SELECT target.*, inserted.{pk_column} '
+            f'FROM target LEFT JOIN inserted ON TRUE'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [target_id, user_id])
+            row = cursor.fetchone()
+        if row is None:
+            raise field.related_model.DoesNotExist
+        target = field.related_model.from_db(
+            self.db, [f.attname for f in target_fields], row[:-1]
+        )
+        if row[-1] is None:
+            return target, None
+        relation = self.build_relation(row[-1], user_id, target.pk)
+        post_save.send(
+            sender=self.model, instance=relation, created=True,
+            update_fields=None, raw=False, using=self.db,
+        )
+        return target, relation
+
+    def add_with_savepoint(self, user_id, target_id, fields):
+        field = self.get_target_field()
+        target = field.related_model.objects.only(*fields).get(pk=target_id)
+        try:
+            with transaction.atomic(using=self.db):
+                relation = self.create(user_id=user_id, **{field.name: target})
+        except IntegrityError:
+            return target, None
+        return target, relation
+
+    def remove(self, user_id, target_id):
+        connection = connections[self.db]
+        field = self.get_target_field()
+        if connection.vendor != 'postgresql':
+            relation = self.filter(
+                user_id=user_id, **{field.attname: target_id}
+            ).first()
+            if relation is not None:
+                relation.delete()
+            return relation
+        quote = connection.ops.quote_name
+        user_column = quote(self.model._meta.get_field('user').column)
+        pk_column = quote(self.model._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(self.model._meta.db_table)} '
+                f'WHERE {user_column} = %s '
+                f'AND {quote(field.column)} = %s RETURNING {pk_column}',
+                [user_id, target_id],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        relation = self.build_relation(row[0], user_id, target_id)
+        for signal in (pre_delete, post_delete):
+            signal.send(sender=self.model, instance=relation, using=self.db)
+        return relation
+
+    def add_many(self, user_id, target_ids):
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return self.change_each(self.add_one, user_id, target_ids)
+        quote = connection.ops.quote_name
+        field = self.get_target_field()
+        target_meta = field.related_model._meta
+        target_pk = quote(target_meta.pk.column)
+        target_column = quote(field.column)
+        sql = (
+            f'WITH target AS ('
+            f'SELECT {target_pk} FROM {quote(target_meta.db_table)} '
+            f'WHERE {target_pk} = ANY(%s)'
+            f'), inserted AS ('
+            f'INSERT INTO {quote(self.model._meta.db_table)} '
+            f'({quote(self.model._meta.get_field("user").column)}, '
+            f'{target_column}) '
+            f'SELECT %s, {target_pk} FROM target '
+            f'ON CONFLICT DO NOTHING RETURNING {target_column}'
+            f') SELECT target.{target_pk}, inserted.{target_column} '
+            f'FROM target LEFT JOIN inserted '
+            f'ON inserted.{target_column} = target.{target_pk}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [list(target_ids), user_id])
+            rows = cursor.fetchall()
+        found = {target_id for target_id, _ in rows}
+        created = {target_id for target_id, inserted in rows if inserted}
+        if created:
+            relations_added.send(
+                sender=self.model, user_id=user_id, target_ids=created
+            )
+        return found, created
+
+    def remove_many(self, user_id, target_ids=None):
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            if target_ids is None:
+                target_ids = self.filter(user_id=user_id).values_list(
+                    self.get_target_field().attname, flat=True
+                )
+            return self.change_each(self.remove, user_id, target_ids)[1]
+        quote = connection.ops.quote_name
+        target_column = quote(self.get_target_field().column)
+        sql = (
+            f'DELETE FROM {quote(self.model._meta.db_table)} '
+            f'WHERE {quote(self.model._meta.get_field("user").column)} = %s'
+        )
+        params = [user_id]
+        if target_ids is not None:
+            sql += f' AND {target_column} = ANY(%s)'
+            params.append(list(target_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} RETURNING {target_column}', params)
+            removed = {target_id for target_id, in cursor.fetchall()}
+        if removed:
+            relations_removed.send(
+                sender=self.model, user_id=user_id, target_ids=removed
+            )
+        return removed
+
+    def existing_targets(self, target_ids):
+        if not target_ids:
+            return set()
+        return set(
+            self.get_target_field().related_model._default_manager.filter(
+                pk__in=target_ids
+            ).values_list('pk', flat=True)
+        )
+
+    def add_one(self, user_id, target_id):
+        try:
+            return self.add(user_id, target_id, ['id'])[1]
+        except self.get_target_field().related_model.DoesNotExist:
+            return False
+
+    def change_each(self, change, user_id, target_ids):
+        found, changed = set(), set()
+        for target_id in set(target_ids):
+            relation = change(user_id, target_id)
+            if relation is not False:
+                found.add(target_id)
+            if relation:
+                changed.add(target_id)
+        return found, changed
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -194,6 +426,8 @@ class Follow(models.Model):
         verbose_name='Автор',
     )
 
+    objects = UserRelationQuerySet.as_manager()
+
     class Meta:
         ordering = ['user', 'author']
         verbose_name = 'Подписка'
@@ -204,6 +438,9 @@ class Follow(models.Model):
                 name='unique_follow',
             )
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'], name='follow_author_idx')
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -220,6 +457,8 @@ class ShoppingCart(models.Model):
         verbose_name='Рецепт',
     )
 
+    objects = UserRelationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-id']
         verbose_name = 'Корзина'
@@ -228,6 +467,9 @@ class ShoppingCart(models.Model):
             models.UniqueConstraint(fields=['user', 'recipe'],
                                     name='unique_cart_user')
         ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'], name='cart_recipe_idx')
+        ]
 
 
 class Favorites(models.Model):
@@ -244,6 +486,8 @@ class Favorites(models.Model):
         verbose_name='Рецепт',
     )
 
+    objects = UserRelationQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранные'
@@ -252,3 +496,132 @@ class Favorites(models.Model):
                 fields=['user', 'recipe'], name='favorite_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='favorite_recipe_idx'
+            )
+        ]
+
+
+def change_counters(model, pks, field, delta):
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_counter(model, pk, field, delta):
+    change_counters(model, [pk], field, delta)
+
+
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+    def apply_deltas(self, user_ids, deltas):
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items() if delta
+        }
+        if not deltas:
+            return
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        rows = sorted(
+            (user_id, ingredient_id, delta)
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items()
+        )
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                self.upsert_amounts(rows[start:start + UPSERT_BATCH_SIZE])
+            self.filter(
+                user_id__in=user_ids,
+                ingredient_id__in=deltas,
+                amount__lte=0,
+            ).delete()
+        bump_version_on_commit(self.model, *user_ids)
+
+    def upsert_amounts(self, rows):
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        meta = self.model._meta
+        table = quote(meta.db_table)
+        user, ingredient, amount = (
+            quote(meta.get_field(name).column)
+            for name in ('user', 'ingredient', 'amount')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({user}, {ingredient}, {amount}) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(rows))} '
+                f'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+                f'SET {amount} = {table}.{amount} + EXCLUDED.{amount}',
+                [value for row in rows for value in row],
+            )
+
+    def recipe_amounts(self, recipe_ids):
+        return dict(RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by().values('ingredient_id').annotate(
+            total=Sum('amount')
+        ).values_list('ingredient_id', 'total'))
+
+    def add_recipes(self, user_id, recipe_ids):
+        self.apply_deltas([user_id], self.recipe_amounts(recipe_ids))
+
+    def remove_recipes(self, user_id, recipe_ids):
+        self.apply_deltas([user_id], {
+            ingredient_id: -amount
+            for ingredient_id, amount in self.recipe_amounts(
+                recipe_ids
+            ).items()
+        })
+
+    def add_recipe(self, user_id, recipe_id):
+        self.add_recipes(user_id, [recipe_id])
+
+    def remove_recipe(self, user_id, recipe_id):
+        self.remove_recipes(user_id, [recipe_id])
+
+    def change_recipe(self, recipe_id, old_amounts, new_amounts):
+        self.apply_deltas(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('user_id', flat=True),
+            {
+                ingredient_id: (
+                    new_amounts.get(ingredient_id, 0)
+                    - old_amounts.get(ingredient_id, 0)
+                )
+                for ingredient_id in {*old_amounts, *new_amounts}
+            }
+        )
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Ингредиент',
+    )
+    amount = models.IntegerField('Количество')
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['user', 'ingredient']
+        verbose_name = 'Ингредиент корзины'
+        verbose_name_plural = 'Ингредиенты корзин'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_cart_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
@@ -0,0 +1,142 @@
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from .models import Ingredient
+from .versions import get_version
+
+FUZZY_THRESHOLD = 0.5
+FUZZY_LIMIT = 10
+SEARCH_LIMIT = 50
+
+
+def normalize(value):
+    return ' '.join(value.lower().replace('ё', 'е').split())
+
+
+def substring_grams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def word_grams(value):
+    grams = set()
+    for word in value.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class IngredientSnapshot:
+    def __init__(self, version, rows):
+        self.version = version
+        entries = []
+        normalized = []
+        keys = []
+        grams = defaultdict(set)
+        words = defaultdict(set)
+        for position, (pk, name, unit) in enumerate(rows):
+            key = normalize(name)
+            entries.append({
+                'id': pk,
+                'name': name,
+                'measurement_unit': unit,
+            })
+            normalized.append(key)
+            keys.append((key, position))
+            for gram in substring_grams(key):
+                grams[gram].add(position)
+            for gram in word_grams(key):
+                words[gram].add(position)
+        keys.sort()
+        self.entries = tuple(entries)
+        self.normalized = tuple(normalized)
+        self.keys = tuple(key for key, _ in keys)
+        self.positions = tuple(position for _, position in keys)
+        self.grams = dict(grams)
+        self.words = dict(words)
+
+    def search(self, query, limit):
+        query = normalize(query)
+        if not query:
+            return list(self.entries)
+
+        found = self.prefix(query)
+        seen = set(found)
+        if len(found) < limit:
+            found += self.substring(query, seen)
+            seen.update(found)
+        if len(found) < limit:
+            found += self.fuzzy(query, seen)
+        return [self.entries[position] for position in found[:limit]]
+
+    def prefix(self, query):
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\uffff', start)
+        return sorted(self.positions[start:end])
+
+    def substring(self, query, seen):
+        if len(query) < 3:
+            candidates = range(len(self.entries))
+        else:
+            postings = sorted(
+                (self.grams.get(gram, set())
+                 for gram in substring_grams(query)),
+                key=len,
+            )
+            candidates = set.intersection(*postings)
+        word_start, inside = [], []
+        for position in sorted(candidates):
+            if position in seen:
+                continue
+            key = self.normalized[position]
+            if f' {query}' in f' {key}':
+                word_start.append(position)
+            elif query in key:
+                inside.append(position)
+        return word_start + inside
+
+    def fuzzy(self, query, seen):
+        query_grams = word_grams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.words.get(gram, ()))
+        scored = [
+            (-count / len(query_grams), position)
+            for position, count in shared.items()
+            if position not in seen
+            and count / len(query_grams) >= FUZZY_THRESHOLD
+        ]
+        scored.sort()
+        return [position for _, position in scored[:FUZZY_LIMIT]]
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def build(self, version):
+        return IngredientSnapshot(
+            version,
+            Ingredient.objects.order_by('name', 'id').values_list(
+                'id', 'name', 'measurement_unit__name'
+            ),
+        )
+
+    def refresh(self):
+        version = get_version(Ingredient)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self.build(version)
+                self._snapshot = snapshot
+        return snapshot
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        return self.refresh().search(query, limit)
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,153 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    Favorites, Follow, Ingredient, Recipe, RecipeIngredient, RecipeTag,
+    ShoppingCart, ShoppingCartIngredient, Tag, UnitOfMeasurement, User,
+    change_counter, change_counters, relations_added, relations_removed,
+)
+from .membership import invalidate_user_state
+from .versions import bump_version_on_commit
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=UnitOfMeasurement)
+@receiver(post_delete, sender=UnitOfMeasurement)
+def ingredient_catalog_changed(sender, **kwargs):
+    bump_version_on_commit(Ingredient)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(sender, **kwargs):
+    bump_version_on_commit(Tag)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    bump_version_on_commit(Recipe, instance.pk)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def recipe_relation_changed(sender, instance, **kwargs):
+    bump_version_on_commit(Recipe, instance.recipe_id)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        bump_version_on_commit(User, instance.pk)
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def user_state_changed(sender, instance, **kwargs):
+    invalidate_user_state(instance.user_id)
+
+
+@receiver(relations_added)
+@receiver(relations_removed)
+def user_relations_changed(sender, user_id, **kwargs):
+    invalidate_user_state(user_id)
+
+
+@receiver(relations_added, sender=ShoppingCart)
+def shopping_carts_added(sender, user_id, target_ids, **kwargs):
+    ShoppingCartIngredient.objects.add_recipes(user_id, target_ids)
+    change_counters(Recipe, target_ids, 'in_carts_count', 1)
+
+
+@receiver(relations_removed, sender=ShoppingCart)
+def shopping_carts_removed(sender, user_id, target_ids, **kwargs):
+    ShoppingCartIngredient.objects.remove_recipes(user_id, target_ids)
+    change_counters(Recipe, target_ids, 'in_carts_count', -1)
+
+
+@receiver(relations_added, sender=Favorites)
+def favorites_added(sender, target_ids, **kwargs):
+    change_counters(Recipe, target_ids, 'favorites_count', 1)
+
+
+@receiver(relations_removed, sender=Favorites)
+def favorites_removed(sender, target_ids, **kwargs):
+    change_counters(Recipe, target_ids, 'favorites_count', -1)
+
+
+@receiver(relations_added, sender=Follow)
+def follows_added(sender, target_ids, **kwargs):
+    change_counters(User, target_ids, 'followers_count', 1)
+
+
+@receiver(relations_removed, sender=Follow)
+def follows_removed(sender, target_ids, **kwargs):
+    change_counters(User, target_ids, 'followers_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    if created:
+        ShoppingCartIngredient.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    ShoppingCartIngredient.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def in_carts_count_increased(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'in_carts_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def in_carts_count_decreased(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'in_carts_count', -1)
+
+
+@receiver(post_save, sender=Favorites)
+def favorites_count_increased(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorites)
+def favorites_count_decreased(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def followers_count_increased(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def followers_count_decreased(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipes_count_increased(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipes_count_decreased(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
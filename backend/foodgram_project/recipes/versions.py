@@ -0,0 +1,47 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'model_version:{}'
+
+versions_lock = threading.Lock()
+
+
+def get_version_key(model, pk=None):
+    key = VERSION_KEY.format(model._meta.label_lower)
+    if pk is None:
+        return key
+    return f'{key}:{pk}'
+
+
+def new_version():
+    return uuid.uuid4().hex, int(time.time())
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        with versions_lock:
+            for key in missing:
+                versions[key] = cache.get_or_set(key, new_version, None)
+    return versions
+
+
+def get_version(model, pk=None):
+    key = get_version_key(model, pk)
+    return get_versions([key])[key]
+
+
+def bump_version(model, *pks):
+    keys = [get_version_key(model, pk) for pk in pks] or [
+        get_version_key(model)
+    ]
+    cache.set_many({key: new_version() for key in keys}, None)
+
+
+def bump_version_on_commit(model, *pks):
+    transaction.on_commit(lambda: bump_version(model, *pks))
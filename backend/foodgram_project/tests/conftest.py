@@ -0,0 +1,103 @@
+import shutil
+import tempfile
+
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag, UnitOfMeasurement,
+    User,
+)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings):
+    settings.MEDIA_ROOT = tempfile.mkdtemp()
+    yield settings.MEDIA_ROOT
+    shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        email=f'{username}@example.com',
+        username=username,
+        first_name=username,
+        last_name=username,
+        password='Pass-1234',
+    )
+
+
+@pytest.fixture
+def make_user(db):
+    return create_user
+
+
+@pytest.fixture
+def user(db):
+    return create_user('user')
+
+
+@pytest.fixture
+def author(db):
+    return create_user('author')
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f'Тег {index}', slug=f'tag-{index}')
+        for index in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    unit = UnitOfMeasurement.objects.create(name='г')
+    return [
+        Ingredient.objects.create(name=f'Ингредиент {index}',
+                                  measurement_unit=unit)
+        for index in range(5)
+    ]
+
+
+@pytest.fixture
+def make_recipe(tags, ingredients):
+    def make_recipe(author, name='Рецепт'):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text='Описание',
+            cooking_time=10,
+            image=SimpleUploadedFile('recipe.gif', SMALL_GIF, 'image/gif'),
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in tags
+        )
+        return recipe
+    return make_recipe
@@ -0,0 +1,75 @@
+import pytest
+
+from recipes.models import RecipeIngredient, ShoppingCartIngredient
+
+
+def cart_amounts(user):
+    return dict(ShoppingCartIngredient.objects.filter(user=user).values_list(
+        'ingredient__name', 'amount'
+    ))
+
+
+@pytest.fixture
+def recipe_in_cart(user_client, author, make_recipe):
+    recipe = make_recipe(author)
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    return recipe
+
+
+@pytest.mark.django_db
+def test_recipe_inline_updates_cart(admin_client, user, author,
+                                    recipe_in_cart, ingredients):
+    rows = list(RecipeIngredient.objects.filter(
+        recipe=recipe_in_cart
+    ).order_by('ingredient_id'))
+    data = {
+        'name': recipe_in_cart.name,
+        'text': recipe_in_cart.text,
+        'author': author.id,
+        'cooking_time': recipe_in_cart.cooking_time,
+        'recipe_ingredients-TOTAL_FORMS': len(rows),
+        'recipe_ingredients-INITIAL_FORMS': len(rows),
+        'recipe_tags-TOTAL_FORMS': 0,
+        'recipe_tags-INITIAL_FORMS': 0,
+    }
+    for index, row in enumerate(rows):
+        data.update({
+            f'recipe_ingredients-{index}-id': row.id,
+            f'recipe_ingredients-{index}-recipe': recipe_in_cart.id,
+            f'recipe_ingredients-{index}-ingredient': row.ingredient_id,
+            f'recipe_ingredients-{index}-amount': row.amount,
+        })
+    data['recipe_ingredients-0-amount'] = 25
+    data['recipe_ingredients-1-DELETE'] = 'on'
+
+    response = admin_client.post(
+        f'/admin/recipes/recipe/{recipe_in_cart.id}/change/', data
+    )
+
+    assert response.status_code == 302
+    assert cart_amounts(user) == {
+        'Ингредиент 0': 25,
+        'Ингредиент 2': 10,
+        'Ингредиент 3': 10,
+        'Ингредиент 4': 10,
+    }
+
+
+@pytest.mark.django_db
+def test_recipe_ingredient_admin_updates_cart(admin_client, user,
+                                              recipe_in_cart, ingredients):
+    row = RecipeIngredient.objects.get(
+        recipe=recipe_in_cart, ingredient=ingredients[0]
+    )
+
+    admin_client.post(f'/admin/recipes/recipeingredient/{row.id}/change/', {
+        'recipe': recipe_in_cart.id,
+        'ingredient': ingredients[0].id,
+        'amount': 40,
+    })
+    assert cart_amounts(user)['Ингредиент 0'] == 40
+
+    admin_client.post(
+        f'/admin/recipes/recipeingredient/{row.id}/delete/', {'post': 'yes'}
+    )
+    assert 'Ингредиент 0' not in cart_amounts(user)
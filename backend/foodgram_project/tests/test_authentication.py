@@ -0,0 +1,71 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import get_token_cache_key, token_cache
+from recipes.models import User
+
+
+@pytest.fixture
+def token_client(author):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=author).key}'
+    )
+    return client
+
+
+@pytest.mark.django_db
+def test_me_uses_cached_user(token_client):
+    token_client.get('/api/users/me/')
+
+    with CaptureQueriesContext(connection) as queries:
+        response = token_client.get('/api/users/me/')
+
+    assert response.status_code == 200
+    assert response.data['first_name'] == 'author'
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_profile_change_invalidates_cached_user(token_client):
+    token_client.get('/api/users/me/')
+    token_client.patch('/api/users/me/', {'first_name': 'Новое имя'})
+
+    response = token_client.get('/api/users/me/')
+
+    assert response.data['first_name'] == 'Новое имя'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_password_change_invalidates_cached_user(token_client, author):
+    token_client.get('/api/users/me/')
+    cache_key = get_token_cache_key(Token.objects.get(user=author).key)
+    assert cache.get(cache_key) is not None
+
+    token_client.post('/api/users/set_password/', {
+        'current_password': 'Pass-1234',
+        'new_password': 'New-pass-5678',
+    })
+
+    assert cache.get(cache_key) is None
+    assert token_cache.get(cache_key) is None
+
+
+@pytest.mark.django_db
+def test_set_password_keeps_counters(token_client, author, user_client):
+    token_client.get('/api/users/me/')
+    user_client.post(f'/api/users/{author.id}/subscribe/')
+
+    response = token_client.post('/api/users/set_password/', {
+        'current_password': 'Pass-1234',
+        'new_password': 'New-pass-5678',
+    })
+
+    author = User.objects.get(pk=author.pk)
+    assert response.status_code == 204
+    assert author.check_password('New-pass-5678')
+    assert author.followers_count == 1
@@ -0,0 +1,32 @@
+import pytest
+
+from recipes.models import Recipe, User
+
+
+@pytest.mark.django_db
+def test_full_recipe_save_keeps_counters(user_client, author, make_recipe):
+    recipe = make_recipe(author)
+    stale = Recipe.objects.get(pk=recipe.pk)
+    user_client.post(f'/api/recipes/{recipe.id}/favorite/')
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    stale.name = 'Новое название'
+    stale.save()
+
+    recipe.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_full_user_save_keeps_counters(user_client, author, make_recipe):
+    stale = User.objects.get(pk=author.pk)
+    make_recipe(author)
+    user_client.post(f'/api/users/{author.id}/subscribe/')
+
+    stale.first_name = 'Новое имя'
+    stale.save()
+
+    author.refresh_from_db()
+    assert author.first_name == 'Новое имя'
+    assert (author.recipes_count, author.followers_count) == (1, 1)
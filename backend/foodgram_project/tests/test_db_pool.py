@@ -0,0 +1,48 @@
+import pytest
+from django.db import connection
+
+from foodgram_project.db.postgresql_pool import base
+
+
+@pytest.fixture
+def pooled(db, monkeypatch):
+    monkeypatch.setattr(base, 'pools', {})
+    wrapper = base.DatabaseWrapper(
+        dict(
+            connection.settings_dict,
+            ENGINE='foodgram_project.db.postgresql_pool',
+            POOL_MIN_SIZE=1,
+            POOL_MAX_SIZE=2,
+        ),
+        alias=connection.alias,
+    )
+    yield wrapper
+    wrapper.pool.closeall()
+
+
+def test_healthy_connection_is_reused(pooled):
+    pooled.ensure_connection()
+    raw = pooled.connection
+    pooled.close()
+
+    pooled.ensure_connection()
+
+    assert pooled.connection is raw
+    pooled.close()
+
+
+@pytest.mark.parametrize('break_connection', [
+    lambda wrapper: setattr(wrapper, 'errors_occurred', True),
+    lambda wrapper: wrapper.connection.close(),
+])
+def test_broken_connection_is_discarded(pooled, break_connection):
+    pooled.ensure_connection()
+    raw = pooled.connection
+    break_connection(pooled)
+    pooled.close()
+
+    pooled.ensure_connection()
+
+    assert raw.closed
+    assert pooled.connection is not raw
+    pooled.close()
@@ -0,0 +1,15 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db(transaction=True)
+def test_seeded_tree_passes_explain_check():
+    call_command('load_ingredients', verbosity=0)
+    call_command(
+        'seed_bench', users=200, recipes=2000, seed=1, verbosity=0,
+        stdout=StringIO(),
+    )
+
+    call_command('explain_queries', stdout=StringIO())
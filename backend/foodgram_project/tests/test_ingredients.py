@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from rest_framework.test import APIClient
+
+from api import mixins
+from recipes import search
+from recipes.models import Ingredient, UnitOfMeasurement
+from recipes.search import (
+    SEARCH_LIMIT, IngredientIndex, IngredientSnapshot,
+)
+from recipes.versions import bump_version
+
+
+@pytest.fixture
+def many_ingredients(db):
+    unit = UnitOfMeasurement.objects.create(name='г')
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ягода {index:03}', measurement_unit=unit)
+        for index in range(SEARCH_LIMIT + 10)
+    )
+    Ingredient.objects.create(name='клубника', measurement_unit=unit)
+    bump_version(Ingredient)
+
+
+def test_search_is_capped(many_ingredients):
+    response = APIClient().get('/api/ingredients/?name=я')
+
+    assert response.status_code == 200
+    assert len(response.data) == SEARCH_LIMIT
+    assert response.data[0]['name'] == 'ягода 000'
+
+
+def test_empty_query_returns_whole_catalog(many_ingredients):
+    response = APIClient().get('/api/ingredients/')
+
+    assert len(response.data) == SEARCH_LIMIT + 11
+
+
+def test_search_is_not_stored_in_cache(many_ingredients, monkeypatch):
+    stored = []
+    monkeypatch.setattr(
+        mixins.cache, 'set', lambda key, *args, **kwargs: stored.append(key)
+    )
+    client = APIClient()
+
+    response = client.get('/api/ingredients/?name=клу')
+    repeated = client.get(
+        '/api/ingredients/?name=клу', HTTP_IF_NONE_MATCH=response['ETag']
+    )
+
+    assert response.data[0]['name'] == 'клубника'
+    assert repeated.status_code == 304
+    assert stored == []
+
+
+def test_search_during_rebuild_sees_consistent_snapshot(monkeypatch):
+    catalogs = [
+        [(index, f'ягода {index:03}', 'г') for index in range(size)]
+        for size in (10, 500)
+    ]
+    versions = [0]
+    index = IngredientIndex()
+    monkeypatch.setattr(search, 'get_version', lambda model: versions[0])
+    monkeypatch.setattr(index, 'build', lambda version: IngredientSnapshot(
+        version, catalogs[version % 2]
+    ))
+    errors = []
+    stop = threading.Event()
+
+    def run_searches():
+        try:
+            while not stop.is_set():
+                for entry in index.search('ягода 0'):
+                    assert entry['name'].startswith('ягода 0')
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run_searches) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for version in range(1, 200):
+        versions[0] = version
+        index.refresh()
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
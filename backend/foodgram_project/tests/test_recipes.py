@@ -0,0 +1,57 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context), response.data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('authenticated', [False, True])
+def test_recipe_list_query_count_does_not_depend_on_page_size(
+    authenticated, user_client, make_user, make_recipe
+):
+    client = user_client if authenticated else APIClient()
+    for index in range(6):
+        make_recipe(make_user(f'author{index}'), f'Рецепт {index}')
+
+    small, small_page = count_queries(client, '/api/recipes/?limit=2')
+    large, large_page = count_queries(client, '/api/recipes/?limit=6')
+
+    assert len(small_page['results']) == 2
+    assert len(large_page['results']) == 6
+    assert small == large
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ['search=суп', 'ordering=popular'])
+def test_cursor_rejects_reordering_params(query, author, make_recipe):
+    make_recipe(author)
+
+    response = APIClient().get(f'/api/recipes/?cursor=&{query}')
+
+    assert response.status_code == 400
+    assert 'cursor' in response.data
+
+
+@pytest.mark.django_db
+def test_cursor_pages_follow_publication_order(make_user, make_recipe):
+    recipes = [
+        make_recipe(make_user(f'author{index}'), f'Рецепт {index}')
+        for index in range(5)
+    ]
+    client = APIClient()
+
+    first = client.get('/api/recipes/?cursor=&limit=3').data
+    second = client.get(first['next']).data
+
+    ids = [recipe['id'] for recipe in first['results'] + second['results']]
+    assert ids == [recipe.id for recipe in reversed(recipes)]
+    assert second['next'] is None
@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, ShoppingCartIngredient, User
+
+WORKERS = 8
+
+
+def send_concurrently(user, method, url):
+    barrier = threading.Barrier(WORKERS)
+
+    def send(_):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            barrier.wait(5)
+            return getattr(client, method)(url).status_code
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        return sorted(executor.map(send, range(WORKERS)))
+
+
+def assert_single_success(statuses, code):
+    assert statuses == [code] + [400] * (WORKERS - 1)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('action, counter', [
+    ('favorite', 'favorites_count'),
+    ('shopping_cart', 'in_carts_count'),
+])
+def test_concurrent_recipe_relation(user, author, make_recipe, action,
+                                    counter):
+    recipe = make_recipe(author)
+    url = f'/api/recipes/{recipe.id}/{action}/'
+
+    assert_single_success(send_concurrently(user, 'post', url), 201)
+    assert getattr(Recipe.objects.get(pk=recipe.pk), counter) == 1
+
+    assert_single_success(send_concurrently(user, 'delete', url), 204)
+    assert getattr(Recipe.objects.get(pk=recipe.pk), counter) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_shopping_cart_keeps_ingredient_totals(user, author,
+                                                          make_recipe):
+    recipe = make_recipe(author)
+    url = f'/api/recipes/{recipe.id}/shopping_cart/'
+
+    send_concurrently(user, 'post', url)
+
+    amounts = ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list('amount', flat=True)
+    assert list(amounts) == [10] * 5
+
+    send_concurrently(user, 'delete', url)
+
+    assert not ShoppingCartIngredient.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_subscribe(user, author):
+    url = f'/api/users/{author.id}/subscribe/'
+
+    assert_single_success(send_concurrently(user, 'post', url), 201)
+    assert User.objects.get(pk=author.pk).followers_count == 1
+
+    assert_single_success(send_concurrently(user, 'delete', url), 204)
+    assert User.objects.get(pk=author.pk).followers_count == 0
+
+
+@pytest.mark.django_db
+def test_batch_delete_reports_unknown_ids(user_client, author, make_recipe):
+    favorite, other = make_recipe(author), make_recipe(author, 'Другой')
+    missing_id = other.id + 1000
+    user_client.post(
+        '/api/recipes/favorite/', {'ids': [favorite.id]}, format='json'
+    )
+
+    response = user_client.delete(
+        '/api/recipes/favorite/',
+        {'ids': [favorite.id, other.id, missing_id]},
+        format='json',
+    )
+
+    assert response.data['results'] == [
+        {'id': favorite.id, 'status': 'deleted'},
+        {'id': other.id, 'status': 'missing'},
+        {'id': missing_id, 'status': 'not_found'},
+    ]
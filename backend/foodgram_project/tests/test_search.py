@@ -0,0 +1,95 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Ingredient, RecipeIngredient
+
+
+def recipe_updates():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT n_tup_upd FROM pg_stat_xact_user_tables '
+            "WHERE relname = 'recipes_recipe'"
+        )
+        return cursor.fetchone()[0]
+
+
+def search(client, query):
+    response = client.get('/api/recipes/', {'search': query})
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+@pytest.mark.django_db
+def test_search_follows_ingredient_changes(user_client, author, make_recipe,
+                                           ingredients):
+    recipe = make_recipe(author, 'Суп')
+    carrot = Ingredient.objects.create(
+        name='Морковь', measurement_unit=ingredients[0].measurement_unit
+    )
+
+    assert search(user_client, 'морковь') == []
+
+    RecipeIngredient.objects.filter(
+        recipe=recipe, ingredient=ingredients[0]
+    ).update(ingredient=carrot)
+
+    assert search(user_client, 'морковь') == [recipe.id]
+
+    RecipeIngredient.objects.filter(ingredient=carrot).delete()
+
+    assert search(user_client, 'морковь') == []
+
+
+@pytest.mark.django_db
+def test_bulk_insert_updates_each_recipe_once(author, make_recipe,
+                                              ingredients):
+    recipe = make_recipe(author, 'Суп')
+    carrot = Ingredient.objects.create(
+        name='Морковь', measurement_unit=ingredients[0].measurement_unit
+    )
+    RecipeIngredient.objects.filter(recipe=recipe).delete()
+    updates = recipe_updates()
+
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in [carrot, *ingredients]
+    ])
+
+    assert recipe_updates() - updates == 1
+    recipe.refresh_from_db()
+    assert 'морков' in str(recipe.search_vector)
+
+
+@pytest.fixture
+def old_relevant_recipe(author, make_recipe):
+    relevant = make_recipe(author, 'Суп')
+    newer = [make_recipe(author, f'Щи {index}') for index in range(3)]
+    for recipe in newer:
+        recipe.text = 'Почти суп'
+        recipe.save()
+    return relevant, newer
+
+
+@pytest.mark.django_db
+def test_old_relevant_recipe_ranks_first(user_client, old_relevant_recipe,
+                                         settings):
+    settings.SEARCH_CANDIDATES = 2
+    relevant, newer = old_relevant_recipe
+
+    response = user_client.get('/api/recipes/', {'search': 'суп'})
+
+    assert response.data['count'] == 3
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        relevant.id, newer[2].id, newer[1].id,
+    ]
+
+
+@pytest.mark.django_db
+def test_uncapped_search_ranks_all_matches(user_client, old_relevant_recipe,
+                                           settings):
+    settings.SEARCH_CANDIDATES = 0
+    relevant, newer = old_relevant_recipe
+
+    response = user_client.get('/api/recipes/', {'search': 'суп'})
+
+    assert response.data['count'] == 4
+    assert response.data['results'][0]['id'] == relevant.id
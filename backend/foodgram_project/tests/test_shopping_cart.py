@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+from django.db import connection, transaction
+
+from recipes.models import ShoppingCartIngredient
+
+
+def run_in_thread(target):
+    errors = []
+
+    def run():
+        try:
+            target()
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, errors
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_deltas_for_new_ingredient_are_summed(user, ingredients):
+    ingredient_id = ingredients[0].id
+    inserted = threading.Event()
+
+    def first():
+        with transaction.atomic():
+            ShoppingCartIngredient.objects.apply_deltas(
+                [user.id], {ingredient_id: 10}
+            )
+            inserted.set()
+            threading.Event().wait(0.5)
+
+    def second():
+        inserted.wait(5)
+        ShoppingCartIngredient.objects.apply_deltas(
+            [user.id], {ingredient_id: 5}
+        )
+
+    threads = [run_in_thread(first), run_in_thread(second)]
+    for thread, _ in threads:
+        thread.join()
+
+    assert [error for _, errors in threads for error in errors] == []
+    assert ShoppingCartIngredient.objects.get(
+        user=user, ingredient_id=ingredient_id
+    ).amount == 15
+
+
+@pytest.mark.django_db
+def test_rows_dropping_to_zero_are_deleted(user, ingredients):
+    first, second = ingredients[0].id, ingredients[1].id
+    ShoppingCartIngredient.objects.apply_deltas(
+        [user.id], {first: 10, second: 3}
+    )
+    ShoppingCartIngredient.objects.apply_deltas(
+        [user.id], {first: -10, second: -1}
+    )
+
+    assert dict(ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list('ingredient_id', 'amount')) == {second: 2}
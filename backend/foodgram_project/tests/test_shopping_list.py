@@ -0,0 +1,95 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import exports
+
+
+class FrozenDatetime(datetime.datetime):
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def download(client, export_format='txt'):
+    response = client.get(
+        f'/api/recipes/download_shopping_cart/?format={export_format}'
+    )
+    assert response.status_code == 200
+    return b''.join(
+        response.streaming_content if response.streaming
+        else [response.content]
+    ).decode()
+
+
+@pytest.mark.django_db
+def test_cached_shopping_list_has_fresh_date(
+    monkeypatch, user_client, author, make_recipe
+):
+    recipe = make_recipe(author)
+    response = user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert response.status_code == 201
+    monkeypatch.setattr(exports.datetime, 'datetime', FrozenDatetime)
+
+    FrozenDatetime.current = datetime.datetime(2022, 1, 1, 10, 0)
+    first = download(user_client)
+    FrozenDatetime.current = datetime.datetime(2022, 1, 1, 11, 30)
+    second = download(user_client)
+
+    assert 'Дата формирования списка: 01-01-2022 10:00' in first
+    assert 'Дата формирования списка: 01-01-2022 11:30' in second
+    assert first.split('\n', 2)[2] == second.split('\n', 2)[2]
+    assert 'Ингредиент 0 - 10 г' in second
+
+
+@pytest.mark.django_db
+def test_unknown_format_is_rejected(user_client):
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/?format=xls'
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_cached_pdf_is_reused_across_minutes(
+    monkeypatch, user_client, author, make_recipe
+):
+    pytest.importorskip('reportlab')
+    recipe = make_recipe(author)
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    monkeypatch.setattr(exports.datetime, 'datetime', FrozenDatetime)
+    url = '/api/recipes/download_shopping_cart/?format=pdf'
+
+    FrozenDatetime.current = datetime.datetime(2022, 1, 1, 10, 0)
+    first = user_client.get(url)
+    first_content = b''.join(first.streaming_content)
+    FrozenDatetime.current = datetime.datetime(2022, 1, 1, 11, 30)
+    with CaptureQueriesContext(connection) as queries:
+        second = user_client.get(url)
+
+    assert not second.streaming
+    assert second.content == first_content
+    assert 'shopping_list_01-01-2022_11-30.pdf' in (
+        second['Content-Disposition']
+    )
+    assert not any(
+        'recipes_shoppingcartingredient' in query['sql']
+        for query in queries.captured_queries
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cart_change_invalidates_cached_list(user_client, author,
+                                             make_recipe):
+    first, second = make_recipe(author), make_recipe(author, 'Второй')
+    user_client.post(f'/api/recipes/{first.id}/shopping_cart/')
+    assert 'Ингредиент 0 - 10 г' in download(user_client)
+
+    user_client.post(f'/api/recipes/{second.id}/shopping_cart/')
+
+    assert 'Ингредиент 0 - 20 г' in download(user_client)
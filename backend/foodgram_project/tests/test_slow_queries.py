@@ -0,0 +1,34 @@
+import pytest
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from api.models import SlowQuery
+from api.slow_queries import SlowQueryMiddleware
+from recipes.models import Tag
+
+
+@pytest.mark.django_db
+def test_slow_queries_are_saved_after_request(settings):
+    settings.SLOW_QUERY_THRESHOLD = 0.000001
+    settings.SLOW_QUERY_EXPLAIN_RATE = 1
+
+    def view(request):
+        return HttpResponse(str(Tag.objects.filter(slug='breakfast').count()))
+
+    middleware = SlowQueryMiddleware(view)
+    middleware(RequestFactory().get('/api/tags/'))
+
+    assert not SlowQuery.objects.exists()
+
+    request_finished.disconnect(close_old_connections)
+    try:
+        request_finished.send(sender=None)
+    finally:
+        request_finished.connect(close_old_connections)
+
+    query = SlowQuery.objects.get()
+    assert query.view == '/api/tags/'
+    assert 'recipes_tag' in query.sql
+    assert 'actual time' in query.plan
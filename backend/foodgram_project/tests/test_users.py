@@ -0,0 +1,50 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def followed(make_user, user_client):
+    authors = [make_user(f'author{index}') for index in range(3)]
+    user_client.post(f'/api/users/{authors[0].id}/subscribe/')
+    return authors
+
+
+def test_user_list_is_paginated_by_page_and_limit(user_client, followed):
+    first = user_client.get('/api/users/?limit=2')
+    second = user_client.get('/api/users/?page=2&limit=2')
+
+    assert first.data['count'] == 4
+    assert len(first.data['results']) == 2
+    assert 'page=2' in first.data['next']
+    assert [item['id'] for item in second.data['results']] == [
+        item['id'] for item in user_client.get(
+            '/api/users/?limit=4'
+        ).data['results'][2:]
+    ]
+
+
+def test_is_subscribed_for_authenticated_user(user, user_client, followed):
+    results = user_client.get('/api/users/').data['results']
+    detail = user_client.get(f'/api/users/{followed[0].id}/')
+    me = user_client.get('/api/users/me/')
+
+    assert {item['id']: item['is_subscribed'] for item in results} == {
+        user.id: False,
+        followed[0].id: True,
+        followed[1].id: False,
+        followed[2].id: False,
+    }
+    assert detail.data['is_subscribed'] is True
+    assert me.data['is_subscribed'] is False
+
+
+@pytest.mark.django_db
+def test_is_subscribed_for_anonymous_user(author, make_recipe):
+    make_recipe(author)
+    client = APIClient()
+
+    recipes = client.get('/api/recipes/').data['results']
+
+    assert recipes[0]['author']['is_subscribed'] is False
+    assert client.get('/api/users/').status_code == 401
+    assert client.get(f'/api/users/{author.id}/').status_code == 401
@@ -12,9 +12,12 @@ class CustomUserAdmin(UserAdmin):
                     'last_name',
                     'email',
                     'is_staff',
-                    'is_active',)
+                    'is_active',
+                    'recipes_count',
+                    'followers_count',)
     search_fields = ('username', 'first_name', 'last_name', 'email',)
     list_filter = ('username', 'email',)
+    readonly_fields = ('recipes_count', 'followers_count',)
     empty_value_display = '-пусто-'
 
     class Meta:
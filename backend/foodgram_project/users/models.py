@@ -5,6 +5,22 @@ from django.db import models
 username_validator = UnicodeUsernameValidator()
 
 
+class CounterFieldsMixin:
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -32,7 +48,7 @@ class CustomUserManager(BaseUserManager):
         return superuser
 
 
-class CustomUser(AbstractUser):
+class CustomUser(CounterFieldsMixin, AbstractUser):
     username = models.CharField(
         'Имя польователя',
         max_length=150,
@@ -49,9 +65,21 @@ class CustomUser(AbstractUser):
     is_active = models.BooleanField('Активный', default=True)
     is_staff = models.BooleanField('Персонал', default=False)
     is_admin = models.BooleanField('Администратор', default=False)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
 
     custom_objects = CustomUserManager()
 
+    counter_fields = ('recipes_count', 'followers_count')
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
         'username',